@@ -11,10 +11,17 @@ BOTSELLER_MAX_WAIT_TIME = int(os.getenv("BOTSELLER_MAX_WAIT_TIME", "60"))
 BOTSELLER_POLL_INTERVAL_FAST = int(os.getenv("BOTSELLER_POLL_INTERVAL_FAST", "1"))
 BOTSELLER_POLL_INTERVAL_SLOW = int(os.getenv("BOTSELLER_POLL_INTERVAL_SLOW", "3"))
 
+# Inspection Configuration
+# Most offers shown to the buyer's LLM in one inspection pass; the rest wait for the next pass
+INSPECT_MAX_OFFERS_PER_PASS = int(os.getenv("INSPECT_MAX_OFFERS_PER_PASS", "20"))
+
 # LLM Configuration
 DEFAULT_LLM_MAX_TOKENS = int(os.getenv("DEFAULT_LLM_MAX_TOKENS", "500"))
 DEFAULT_LLM_TEMPERATURE = float(os.getenv("DEFAULT_LLM_TEMPERATURE", "0.7"))
 
+# Request validation limits
+MAX_TEXT_FIELD_LENGTH = int(os.getenv("MAX_TEXT_FIELD_LENGTH", "65536"))
+
 # Database Configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./infonomy_server.db")
 
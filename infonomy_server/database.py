@@ -1,3 +1,5 @@
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import create_engine, SQLModel, Session
 from contextlib import contextmanager
 from infonomy_server.logging_config import database_logger, log_business_event
@@ -11,10 +13,48 @@ def create_db_and_tables():
         "database_url": DATABASE_URL
     })
     SQLModel.metadata.create_all(engine)
+    _create_missing_indexes()
     log_business_event(database_logger, "database_tables_created", parameters={
         "tables": list(SQLModel.metadata.tables.keys())
     })
 
+def _create_missing_indexes():
+    """
+    create_all() skips tables that already exist, so indexes added to the models later
+    never reach an existing database: create any that are missing.
+    """
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with engine.begin() as conn:
+                    index.create(conn, checkfirst=True)
+            except IntegrityError:
+                # only the unique inbox index can fail this way, on a database that
+                # predates it; clear the duplicates it reports and try once more
+                if index.name != "ux_matcherinbox_matcher_context":
+                    raise
+                _dedupe_matcher_inbox()
+                with engine.begin() as conn:
+                    index.create(conn, checkfirst=True)
+
+def _dedupe_matcher_inbox():
+    """
+    One-off cleanup for databases created before the unique (matcher, context) index:
+    keep one inbox item per pair, preferring one whose status a seller has changed
+    from "new", then the oldest.
+    """
+    with engine.begin() as conn:
+        removed = conn.execute(text(
+            "DELETE FROM matcherinbox WHERE id NOT IN ("
+            "SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+            "PARTITION BY matcher_id, decision_context_id "
+            "ORDER BY CASE WHEN status = 'new' THEN 1 ELSE 0 END, id"
+            ") AS rn FROM matcherinbox) AS ranked WHERE rn = 1)"
+        )).rowcount
+    log_business_event(database_logger, "matcher_inbox_deduplicated", parameters={
+        "rows_removed": removed
+    })
+
 @contextmanager
 def get_session():
     with Session(engine) as session:
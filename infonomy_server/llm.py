@@ -1,8 +1,11 @@
+import os
+import time
 from typing import List, Tuple, Optional
 import instructor
 from litellm import completion
 from pydantic import BaseModel, model_validator
 from infonomy_server.models import DecisionContext, InfoOffer, LLMBuyerType, User
+from infonomy_server.utils import temporary_api_keys
 from infonomy_server.logging_config import llm_logger, log_llm_call, log_function_call, log_function_return, log_function_error
 
 CLIENT = instructor.from_litellm(completion, mode=instructor.Mode.JSON)
@@ -181,13 +184,8 @@ def call_llm(
     # Use user's API keys if available, otherwise fall back to server defaults
     api_keys = user.api_keys if user and user.api_keys else {}
 
-    # Import the context manager
-    from infonomy_server.utils import temporary_api_keys
-
     while not accept:
         with temporary_api_keys(api_keys):
-            import time
-            import os
             start_time = time.time()
             
             # Get all environment variables (within the context manager)
@@ -258,7 +256,6 @@ def call_llm(
                     if not raw_response and "validation error" in str(e).lower():
                         try:
                             # Make a direct call without response_model to get the raw response
-                            from litellm import completion
                             raw_completion = completion(
                                 model=buyer.model,
                                 messages=messages,
@@ -316,7 +313,7 @@ def call_llm(
             log_function_return(llm_logger, "call_llm", {
                 "result_type": "chosen_offers",
                 "chosen_offer_ids": response.chosen_offer_ids,
-                "total_cost": sum(io.price for io in offers if io.id in response.chosen_offer_ids)
+                "total_cost": total_cost
             })
             return result
         elif response.followup_query:
@@ -9,6 +9,8 @@ from infonomy_server.middleware import setup_logging_middleware
 from infonomy_server.logging_config import general_logger, log_business_event
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
 # Import Celery app to ensure configuration is loaded
 import sys
@@ -16,7 +18,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from celery_app import celery
 
-app = FastAPI(title="Infonomy", version="1.0.0")
+app = FastAPI(title="Infonomy", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Setup CORS
 app.add_middleware(
@@ -27,6 +29,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (template-rendered HTML pages, list endpoints)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Setup logging middleware
 setup_logging_middleware(app)
 
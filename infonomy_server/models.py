@@ -1,6 +1,6 @@
 # from __future__ import annotations
 from sqlmodel import SQLModel, Field, Relationship, Session, select
-from sqlalchemy import Column, JSON, String, CheckConstraint, Table, ForeignKey #, Computed, Float, case
+from sqlalchemy import Column, JSON, String, CheckConstraint, Index, Table, ForeignKey, text #, Computed, Float, case
 # from fastapi_users.db import SQLAlchemyBaseUserTableUUID
 from fastapi_users_db_sqlmodel import SQLModelBaseUserDB
 from typing import Optional, List, Literal
@@ -131,6 +131,57 @@ class HumanBuyer(SQLModel, table=True):
             purchased = self.num_purchased.get(prio, 0)
             rates[prio] = purchased / qcount if qcount else 0.0
         return rates
+
+    @staticmethod
+    def _count_for(counts: Optional[dict], priority: int) -> int:
+        """
+        One priority's counter; JSON columns round-trip dict keys as strings, so a loaded
+        row has "1" where a fresh one has 1.
+        """
+        if not counts:
+            return 0
+        return counts.get(priority, counts.get(str(priority), 0))
+
+    def rates_for(self, priority: int) -> tuple[float, float]:
+        """
+        (inspection_rate, purchase_rate) for one priority, as the properties would give,
+        without building the dicts for every priority.
+        """
+        qcount = self._count_for(self.num_queries, priority)
+        if not qcount:
+            return 0.0, 0.0
+        return (
+            self._count_for(self.num_inspected, priority) / qcount,
+            self._count_for(self.num_purchased, priority) / qcount,
+        )
+
+    def stats_arrays(self) -> dict[str, list]:
+        """
+        Struct-of-arrays view of the per-priority counters and rates, ordered by priority.
+        JSON columns round-trip dict keys as strings, so keys are normalised to int here.
+        """
+        queries = {int(k): v for k, v in (self.num_queries or {}).items()}
+        inspected = {int(k): v for k, v in (self.num_inspected or {}).items()}
+        purchased = {int(k): v for k, v in (self.num_purchased or {}).items()}
+        priorities = sorted(queries)
+        arrays: dict[str, list] = {
+            "priorities": priorities,
+            "num_queries": [],
+            "num_inspected": [],
+            "num_purchased": [],
+            "inspection_rate": [],
+            "purchase_rate": [],
+        }
+        for prio in priorities:
+            qcount = queries[prio]
+            icount = inspected.get(prio, 0)
+            pcount = purchased.get(prio, 0)
+            arrays["num_queries"].append(qcount)
+            arrays["num_inspected"].append(icount)
+            arrays["num_purchased"].append(pcount)
+            arrays["inspection_rate"].append(icount / qcount if qcount else 0.0)
+            arrays["purchase_rate"].append(pcount / qcount if qcount else 0.0)
+        return arrays
     # inspection_rate: dict[int, float] = Field(
     #     sa_column=Column(
     #         Float,
@@ -261,6 +312,18 @@ class BotSeller(SQLModel, table=True):
     #     return self
 
 class SellerMatcher(SQLModel, table=True):
+    __table_args__ = (
+        # BotSeller processing filters bot matchers by these numeric thresholds; partial, so
+        # human-seller matchers (bot_seller_id IS NULL) don't take up space in it
+        Index(
+            "ix_sellermatcher_bot_seller_budget_priority",
+            "bot_seller_id", "min_max_budget", "min_priority",
+            sqlite_where=text("bot_seller_id IS NOT NULL"),
+            postgresql_where=text("bot_seller_id IS NOT NULL"),
+        ),
+        # recompute_inbox_for_context range-scans all matchers by the same thresholds
+        Index("ix_sellermatcher_budget_priority", "min_max_budget", "min_priority"),
+    )
     id: int = Field(primary_key=True)
     human_seller_id: Optional[int] = Field(foreign_key="human_seller.id", index=True, default=None)
     bot_seller_id: Optional[int] = Field(foreign_key="bot_seller.id", index=True, default=None)
@@ -315,6 +378,15 @@ class SellerMatcher(SQLModel, table=True):
         return "unknown"
 
 class DecisionContext(SQLModel, table=True):
+    __table_args__ = (
+        # recompute_inbox_for_matcher range-scans top-level contexts by these thresholds
+        Index(
+            "ix_decisioncontext_toplevel_budget_priority",
+            "max_budget", "priority",
+            sqlite_where=text("parent_id IS NULL"),
+            postgresql_where=text("parent_id IS NULL"),
+        ),
+    )
     id: int = Field(primary_key=True)
     query: Optional[str] = Field(index=True, default=None, description="Custom query for information")
     context_pages: Optional[List[str]] = Field(sa_column=Column(JSON, index=True), default=None, description="Context pages, e.g. https://metaculus.com/...")
@@ -410,6 +482,16 @@ class DecisionContext(SQLModel, table=True):
             self.parent_offers.remove(offer)
 
 class InfoOffer(SQLModel, table=True):
+    __table_args__ = (
+        # inspect_task looks up a context's unpurchased, not-yet-inspected offers; partial, so
+        # purchased offers (most rows, eventually) don't take up space in it
+        Index(
+            "ix_infooffer_ctx_purchased_inspected",
+            "context_id", "purchased", "inspected",
+            sqlite_where=text("purchased = 0"),
+            postgresql_where=text("purchased = false"),
+        ),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     human_seller_id: Optional[int] = Field(foreign_key="human_seller.id", index=True, default=None)
     bot_seller_id: Optional[int] = Field(foreign_key="bot_seller.id", index=True, default=None)
@@ -469,6 +551,10 @@ class InfoOffer(SQLModel, table=True):
         return "unknown"
 
 class MatcherInbox(SQLModel, table=True):
+    __table_args__ = (
+        # one item per (matcher, context); inbox recomputes upsert against it
+        Index("ux_matcherinbox_matcher_context", "matcher_id", "decision_context_id", unique=True),
+    )
     id: int = Field(primary_key=True)
     matcher_id: int = Field(foreign_key="sellermatcher.id", index=True)
     decision_context_id: int = Field(foreign_key="decisioncontext.id", index=True)
@@ -482,4 +568,16 @@ class MatcherInbox(SQLModel, table=True):
 
     # Relationships
     matcher: SellerMatcher = Relationship(back_populates="inbox_items")
-    decision_context: DecisionContext = Relationship()
\ No newline at end of file
+    decision_context: DecisionContext = Relationship()
+
+
+class Inspection(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    context_id: int = Field(foreign_key="decisioncontext.id", index=True, description="Top-level context being inspected")
+    buyer_id: int = Field(foreign_key="humanbuyer.id", index=True)
+    purchased: List[int] = Field(
+        default_factory=list,
+        sa_column=Column(JSON, nullable=False),
+        description="IDs of InfoOffers purchased so far (across the context and its recursive children)",
+    )
+    created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
@@ -13,13 +13,15 @@ from infonomy_server.schemas import (
     SellerMatcherRead,
     SellerMatcherCreate,
     SellerMatcherUpdate,
+    MATCHER_LIST_ADAPTER,
 )
 from infonomy_server.auth import current_active_user
 from infonomy_server.logging_config import bot_sellers_logger, log_business_event
 from typing import List
 from infonomy_server.utils import (
     recompute_inbox_for_matcher, 
-    remove_matcher_from_inboxes
+    remove_matcher_from_inboxes,
+    adapter_json_response,
 )
 
 router = APIRouter(prefix="/bot-sellers", tags=["bot-sellers"])
@@ -185,7 +187,7 @@ def list_bot_seller_matchers(
         .where(SellerMatcher.bot_seller_id == bot_seller_id)
         .where(SellerMatcher.seller_type == "bot_seller")
     ).all()
-    return matchers
+    return adapter_json_response(MATCHER_LIST_ADAPTER, matchers)
 
 @router.put("/{bot_seller_id}/matchers/{matcher_id}", response_model=SellerMatcherRead)
 def update_bot_seller_matcher(
@@ -11,12 +11,15 @@ from infonomy_server.schemas import (
     DecisionContextCreateNonRecursive,
     DecisionContextRead,
     DecisionContextUpdateNonRecursive,
+    DECISION_CTX_ADAPTER,
+    DECISION_CTX_LIST_ADAPTER,
 )
 from infonomy_server.auth import current_active_user
 from infonomy_server.utils import (
     get_context_for_buyer,
     recompute_inbox_for_context,
-    increment_buyer_query_counter
+    increment_buyer_query_counter,
+    adapter_json_response,
 )
 from infonomy_server.logging_config import api_logger, log_business_event
 from typing import List, Optional
@@ -67,7 +70,7 @@ def create_decision_context(
     db.add(current_user)
     
     ctx = DecisionContext(
-        **decision_context.dict(),
+        **decision_context.model_dump(),
         buyer_id=current_user.id,
         created_at=datetime.utcnow(),
     )
@@ -102,7 +105,7 @@ def update_decision_context(
     db: Session = Depends(get_db),
 ):
     # apply only the fields the client sent
-    for k, v in context_updates.dict(exclude_unset=True).items():
+    for k, v in context_updates.model_dump(exclude_unset=True).items():
         setattr(db_context, k, v)
     db.add(db_context)
     db.commit()
@@ -140,7 +143,7 @@ def read_decision_context(
         raise HTTPException(status_code=404, detail="Decision context not found")
     if db_context.parent_id is not None:
         raise HTTPException(status_code=403, detail="Recursive contexts are not made public")
-    return db_context
+    return adapter_json_response(DECISION_CTX_ADAPTER, db_context)
 
 
 @router.get("/questions", response_model=List[DecisionContextRead])
@@ -158,7 +161,7 @@ def list_decision_contexts(
         .limit(limit)
     )
     contexts = db.exec(stmt).all()
-    return contexts
+    return adapter_json_response(DECISION_CTX_LIST_ADAPTER, contexts)
 
 
 @router.get("/users/me/questions", response_model=List[DecisionContextRead])
@@ -183,7 +186,7 @@ def list_current_user_decision_contexts(
         .limit(limit)
     )
     contexts = db.exec(stmt).all()
-    return contexts
+    return adapter_json_response(DECISION_CTX_LIST_ADAPTER, contexts)
 
 
 @router.get("/users/{user_id}/questions", response_model=List[DecisionContextRead])
@@ -204,7 +207,7 @@ def list_user_decision_contexts(
         .limit(limit)
     )
     contexts = db.exec(stmt).all()
-    return contexts
+    return adapter_json_response(DECISION_CTX_LIST_ADAPTER, contexts)
 
 
 
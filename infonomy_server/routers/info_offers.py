@@ -16,7 +16,9 @@ from infonomy_server.schemas import (
     InfoOfferReadPublic,
     InfoOfferCreate,
     InfoOfferUpdate,
+    INFO_OFFER_LIST_ADAPTER,
 )
+from infonomy_server.utils import adapter_json_response
 from infonomy_server.auth import current_active_user
 from infonomy_server.logging_config import api_logger, log_business_event
 
@@ -62,7 +64,7 @@ def create_info_offer(
 
     # 3) Create the InfoOffer
     offer = InfoOffer(
-        **info_offer.dict(exclude_unset=True),
+        **info_offer.model_dump(exclude_unset=True),
         context_id=context_id,
         human_seller_id=human_seller.id,
         created_at=datetime.utcnow(),
@@ -118,7 +120,7 @@ def update_info_offer(
         )
 
     # 3) Apply updates
-    for k, v in info_offer.dict(exclude_unset=True).items():
+    for k, v in info_offer.model_dump(exclude_unset=True).items():
         setattr(offer, k, v)
     db.add(offer)
     db.commit()
@@ -202,9 +204,9 @@ def read_info_offer(
     )
 
     if is_human_seller or is_bot_seller or is_buyer_who_purchased:
-        return InfoOfferReadPrivate.from_orm(db_info_offer)
+        return InfoOfferReadPrivate.model_validate(db_info_offer)
     else:
-        return InfoOfferReadPublic.from_orm(db_info_offer)
+        return InfoOfferReadPublic.model_validate(db_info_offer)
 
 
 @router.get(
@@ -233,13 +235,13 @@ def read_info_offers_for_decision_context(
 
         if is_seller:
             # seller sees the full private schema
-            result.append(InfoOfferReadPrivate.from_orm(offer))
+            result.append(InfoOfferReadPrivate.model_validate(offer))
         elif is_buyer_who_purchased:
             # buyer after purchase sees the public schema
-            result.append(InfoOfferReadPublic.from_orm(offer))
+            result.append(InfoOfferReadPublic.model_validate(offer))
         else:
             # everyone else: public view
-            result.append(InfoOfferReadPublic.from_orm(offer))
+            result.append(InfoOfferReadPublic.model_validate(offer))
 
     return result
 
@@ -269,10 +271,10 @@ def read_info_offers_private_for_decision_context(
 
         if is_seller:
             # seller sees the full private schema
-            result.append(InfoOfferReadPrivate.from_orm(offer))
+            result.append(InfoOfferReadPrivate.model_validate(offer))
         elif is_buyer_who_purchased:
             # buyer after purchase sees the public schema
-            result.append(InfoOfferReadPrivate.from_orm(offer))
+            result.append(InfoOfferReadPrivate.model_validate(offer))
         
     return result    
 
@@ -294,16 +296,16 @@ def read_info_offers_public_for_decision_context(
     # 2) Load all offers for that context
     offers = db.exec(select(InfoOffer).where(InfoOffer.context_id == context_id)).all()
 
-    # 3) For each offer, only return those whose private info is available to the current user
-    result: List[InfoOfferReadPrivate] = []
+    # 3) For each offer, only return those whose private info is not available to the current user
+    result: List[InfoOffer] = []
     for offer in offers:
         is_seller = (offer.seller.type == "human_seller" and offer.seller.id == current_user.id)
         is_buyer_who_purchased = offer.purchased and ctx.buyer_id == current_user.id
 
         if not is_seller and not is_buyer_who_purchased:
-            result.append(InfoOfferReadPublic.from_orm(offer))
+            result.append(offer)
         
-    return result    
+    return adapter_json_response(INFO_OFFER_LIST_ADAPTER, result)
 
 
 
@@ -410,4 +412,4 @@ def list_user_info_offers(
     paginated_offers = offers[skip:skip + limit]
     
     # Return public view for all offers
-    return [InfoOfferReadPublic.from_orm(offer) for offer in paginated_offers]
+    return adapter_json_response(INFO_OFFER_LIST_ADAPTER, paginated_offers)
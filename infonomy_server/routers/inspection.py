@@ -7,8 +7,8 @@ from infonomy_server.database import get_db
 from infonomy_server.auth import current_active_user
 from celery_app import celery
 from infonomy_server.tasks import inspect_task  # our Celery task
-from infonomy_server.models import DecisionContext
-from infonomy_server.schemas import UserRead
+from infonomy_server.models import DecisionContext, Inspection
+from infonomy_server.schemas import UserRead, InspectionRead
 from infonomy_server.logging_config import inspection_logger, log_business_event
 
 router = APIRouter(tags=["inspection"])
@@ -37,20 +37,43 @@ def inspect_context(
         })
         raise HTTPException(status_code=404, detail="Context not found")
 
+    # record the inspection up front so purchases are persisted as they happen
+    inspection = Inspection(context_id=context_id, buyer_id=current_user.id)
+    db.add(inspection)
+    db.commit()
+    db.refresh(inspection)
+
     # enqueue the background job
     # you can pass countdown= or other options to apply_async
     async_result = inspect_task.apply_async(
         args=[context_id, current_user.id],
+        kwargs={"inspection_id": inspection.id},
     )
     
     # Log successful job creation
     log_business_event(inspection_logger, "inspection_job_created", user_id=current_user.id, parameters={
         "context_id": context_id,
         "job_id": async_result.id,
+        "inspection_id": inspection.id,
         "max_budget": ctx.max_budget
     })
 
-    return {"job_id": async_result.id}
+    return {"job_id": async_result.id, "inspection_id": inspection.id}
+
+
+@router.get("/inspections/{inspection_id}", response_model=InspectionRead)
+def get_inspection(
+    inspection_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(current_active_user),
+):
+    """
+    Returns the inspection record, including the offers purchased so far.
+    """
+    inspection = db.get(Inspection, inspection_id)
+    if not inspection or inspection.buyer_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Inspection not found")
+    return inspection
 
 
 @router.get("/jobs/{job_id}/status")
@@ -15,6 +15,7 @@ from infonomy_server.schemas import (
     SellerMatcherRead,
     SellerMatcherUpdate,
     SellerMatcherCreate,
+    MATCHER_LIST_ADAPTER,
 )
 from infonomy_server.auth import current_active_user
 from infonomy_server.logging_config import api_logger, log_business_event
@@ -23,7 +24,8 @@ from infonomy_server.utils import (
     get_context_for_buyer, 
     recompute_inbox_for_matcher, 
     remove_matcher_from_inboxes,
-    get_buyer_stats_summary
+    get_buyer_stats_summary,
+    adapter_json_response,
 )
 from infonomy_server.auth_helpers import get_current_user_from_token
 
@@ -196,7 +198,7 @@ def list_human_seller_matchers(
         select(SellerMatcher)
         .where(SellerMatcher.human_seller_id == human_seller.id)
     ).all()
-    return matchers
+    return adapter_json_response(MATCHER_LIST_ADAPTER, matchers)
 
 
 @router.put("/sellers/me/matchers/{matcher_id}", response_model=SellerMatcherRead)
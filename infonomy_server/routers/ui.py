@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Request, Depends, HTTPException, Form, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, ORJSONResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel import Session, select
+from sqlalchemy.orm import aliased
 from typing import Optional, List
 from infonomy_server.database import get_db
 from infonomy_server.models import User, DecisionContext, InfoOffer, HumanBuyer, HumanSeller, BotSeller, SellerMatcher, MatcherInbox
@@ -129,16 +130,24 @@ async def question_detail_page(
     """Individual question page with answers"""
     context = await get_user_context(request, db)
     
-    # Get the question
-    question = db.get(DecisionContext, question_id)
-    if not question:
+    # Get the question together with its buyer (used to check if current user is the question poster)
+    question_with_buyer = db.exec(
+        select(DecisionContext, User)
+        .join(User, DecisionContext.buyer_id == User.id)
+        .where(DecisionContext.id == question_id)
+    ).first()
+    if not question_with_buyer:
         raise HTTPException(status_code=404, detail="Question not found")
+    question, buyer = question_with_buyer
     
-    # Get all info offers for this question with seller information
+    # Get all info offers for this question with seller information,
+    # including the bot seller owner so we don't need a lookup per offer
+    BotSellerOwner = aliased(User)
     info_offers_with_sellers = db.exec(
-        select(InfoOffer, User, BotSeller)
+        select(InfoOffer, User, BotSeller, BotSellerOwner)
         .outerjoin(User, InfoOffer.human_seller_id == User.id)
         .outerjoin(BotSeller, InfoOffer.bot_seller_id == BotSeller.id)
+        .outerjoin(BotSellerOwner, BotSeller.user_id == BotSellerOwner.id)
         .where(InfoOffer.context_id == question_id)
         .order_by(InfoOffer.created_at.asc())
     ).all()
@@ -146,12 +155,7 @@ async def question_detail_page(
     # Extract info offers and seller info
     info_offers_data = []
     for result in info_offers_with_sellers:
-        info_offer, human_seller, bot_seller = result
-        
-        # Get bot seller owner info if it's a bot seller
-        bot_seller_owner = None
-        if bot_seller:
-            bot_seller_owner = db.get(User, bot_seller.user_id)
+        info_offer, human_seller, bot_seller, bot_seller_owner = result
         
         info_offers_data.append({
             "info_offer": info_offer,
@@ -160,9 +164,6 @@ async def question_detail_page(
             "bot_seller_owner": bot_seller_owner
         })
     
-    # Get buyer info to check if current user is the question poster
-    buyer = db.get(User, question.buyer_id)
-    
     context.update({
         "question": question,
         "info_offers_data": info_offers_data,
@@ -183,7 +184,7 @@ async def users_page(request: Request, db: Session = Depends(get_db)):
     context["users"] = users
     return templates.TemplateResponse("users.html", context)
 
-@router.get("/api/users/me")
+@router.get("/api/users/me", response_class=ORJSONResponse)
 async def get_current_user_api(
     request: Request, 
     db: Session = Depends(get_db)
@@ -343,7 +344,7 @@ async def create_question(
     db.add(current_user)
     
     ctx = DecisionContext(
-        **question_data.dict(),
+        **question_data.model_dump(),
         buyer_id=current_user.id,
         created_at=datetime.utcnow(),
     )
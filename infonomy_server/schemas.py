@@ -1,10 +1,13 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model, model_validator
+from pydantic import Field as PydanticField
 from datetime import datetime
-from typing import Optional, List
+from typing import Annotated, Optional, List
+from typing_extensions import Self
 from fastapi_users import schemas
 from sqlmodel import SQLModel, Field
 import uuid
-from infonomy_server.models import LLMBuyerType
+from infonomy_server.models import LLMBuyerType, HumanBuyer
+from infonomy_server.config import MAX_TEXT_FIELD_LENGTH
 
 class UserRead(schemas.BaseUser[int]):
     username: str
@@ -32,40 +35,38 @@ class UserUpdate(schemas.BaseUserUpdate):
 class HumanBuyerRead(SQLModel):
     id: int
     default_child_llm: LLMBuyerType
-    num_queries: dict[int, int]
-    num_inspected: dict[int, int]
-    num_purchased: dict[int, int]
-    inspection_rate: dict[int, float]
-    purchase_rate: dict[int, float]
-
-    class Config:
-        orm_mode = True
+    # stats are parallel arrays: entry i of each list refers to priority priorities[i]
+    priorities: List[int]
+    num_queries: List[int]
+    num_inspected: List[int]
+    num_purchased: List[int]
+    inspection_rate: List[float]
+    purchase_rate: List[float]
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def stats_to_arrays(cls, data):
+        if isinstance(data, HumanBuyer):
+            return {
+                "id": data.id,
+                "default_child_llm": data.default_child_llm,
+                **data.stats_arrays(),
+            }
+        return data
 
 class HumanBuyerCreate(SQLModel):
     default_child_llm:  LLMBuyerType = LLMBuyerType()
 
+    model_config = ConfigDict(defer_build=True)
+
 class HumanBuyerUpdate(SQLModel):
     default_child_llm:    Optional[LLMBuyerType] = None
 
-class SellerMatcherRead(SQLModel):
-    id:                 int
-    human_seller_id:    Optional[int]
-    bot_seller_id:      Optional[int]
-    keywords:           Optional[List[str]]
-    context_pages:      Optional[List[str]]
-    min_max_budget:     float
-    min_inspection_rate: float
-    min_purchase_rate:   float
-    min_priority:        int
-    buyer_type:          Optional[str]
-    buyer_llm_model:     Optional[List[str]]
-    buyer_system_prompt: Optional[List[str]]
-    age_limit:           Optional[int]
-
-    class Config:
-        orm_mode = True
-
-class SellerMatcherCreate(SQLModel):
+    model_config = ConfigDict(defer_build=True)
+
+class SellerMatcherBase(SQLModel):
     keywords:           Optional[List[str]] = None
     context_pages:      Optional[List[str]] = None
     min_max_budget:     float = 0.0
@@ -77,25 +78,36 @@ class SellerMatcherCreate(SQLModel):
     buyer_system_prompt: Optional[List[str]] = None
     age_limit:           Optional[int] = None
 
-class SellerMatcherUpdate(SQLModel):
-    keywords:           Optional[List[str]] = None
-    context_pages:      Optional[List[str]] = None
-    min_max_budget:     Optional[float] = None
-    min_inspection_rate: Optional[float] = None
-    min_purchase_rate:   Optional[float] = None
-    min_priority:        Optional[int] = None
-    buyer_type:          Optional[str] = None
-    buyer_llm_model:     Optional[List[str]] = None
-    buyer_system_prompt: Optional[List[str]] = None
-    age_limit:           Optional[int] = None
+class SellerMatcherRead(SellerMatcherBase):
+    id:                 int
+    human_seller_id:    Optional[int]
+    bot_seller_id:      Optional[int]
+
+    model_config = ConfigDict(from_attributes=True)
+
+class SellerMatcherCreate(SellerMatcherBase):
+    model_config = ConfigDict(defer_build=True)
+
+class _DeferredBuildModel(SQLModel):
+    model_config = ConfigDict(defer_build=True)
+
+# same fields as SellerMatcherBase, all optional, so clients can send partial updates
+SellerMatcherUpdate = create_model(
+    "SellerMatcherUpdate",
+    __base__=_DeferredBuildModel,
+    __module__=__name__,
+    **{
+        name: (Optional[field.annotation], None)
+        for name, field in SellerMatcherBase.model_fields.items()
+    },
+)
 
 class SellerRead(SQLModel):
     id: int
     matchers: List[SellerMatcherRead]
     type: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # none of these need models -- seller accounts can be created without any info, and then matchers can be added later
 
@@ -112,8 +124,7 @@ class HumanSellerRead(SQLModel):
     matchers: List[SellerMatcherRead]
     info_offers: List["InfoOfferReadPublic"]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # class HumanSellerCreate(SellerCreate):
 #     pass
@@ -138,12 +149,16 @@ class BotSellerCreate(SQLModel):
     llm_model: Optional[str] = None
     llm_prompt: Optional[str] = None
 
+    model_config = ConfigDict(defer_build=True)
+
 class BotSellerUpdate(SQLModel):
     info: Optional[str] = None
     price: Optional[float] = None
     llm_model: Optional[str] = None
     llm_prompt: Optional[str] = None
 
+    model_config = ConfigDict(defer_build=True)
+
 class DecisionContextRead(SQLModel):
     id: int
     query: Optional[str]
@@ -156,29 +171,35 @@ class DecisionContextRead(SQLModel):
     created_at: datetime
     # # for recursive
     # children: Optional[List["DecisionContextRead"]]
-    parent: Optional["DecisionContextRead"]
+    parent: Optional[Self]
     # info_offers_being_inspected: Optional[List["InfoOfferReadPrivate"]]
     # info_offers_already_purchased: Optional[List["InfoOfferReadPrivate"]]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+# seller ID lists are only read by handlers; cap them so one request can't balloon the inbox query
+SellerIdList = Annotated[List[int], PydanticField(max_length=256)]
 
 class DecisionContextCreateNonRecursive(SQLModel):
     query: Optional[str] = None
     context_pages: Optional[List[str]] = None
     max_budget: float
-    human_seller_ids: Optional[List[int]] = None
-    bot_seller_ids: Optional[List[int]] = None
+    human_seller_ids: Optional[SellerIdList] = None
+    bot_seller_ids: Optional[SellerIdList] = None
     priority: int = 0
 
+    model_config = ConfigDict(defer_build=True, frozen=True)
+
 class DecisionContextUpdateNonRecursive(SQLModel):
     query: Optional[str] = None
     context_pages: Optional[List[str]] = None
     max_budget: Optional[float] = None
-    human_seller_ids: Optional[List[int]] = None
-    bot_seller_ids: Optional[List[int]] = None
+    human_seller_ids: Optional[SellerIdList] = None
+    bot_seller_ids: Optional[SellerIdList] = None
     priority: Optional[int] = None
 
+    model_config = ConfigDict(defer_build=True)
+
 class InfoOfferReadPublic(SQLModel):
     id: int
     human_seller_id: Optional[int]
@@ -189,8 +210,7 @@ class InfoOfferReadPublic(SQLModel):
     price: float
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class InfoOfferReadPrivate(InfoOfferReadPublic):
     private_info: str
@@ -200,9 +220,30 @@ class InfoOfferCreate(SQLModel):
     public_info: Optional[str] = None
     price: float = 0.0
 
+    model_config = ConfigDict(defer_build=True, extra="forbid", str_max_length=MAX_TEXT_FIELD_LENGTH)
+
 class InfoOfferUpdate(SQLModel):
     private_info: Optional[str] = None
     public_info: Optional[str] = None
     price: Optional[float] = None
 
-DecisionContextRead.update_forward_refs()
\ No newline at end of file
+    model_config = ConfigDict(defer_build=True, extra="forbid", str_max_length=MAX_TEXT_FIELD_LENGTH)
+
+class InspectionRead(SQLModel):
+    id: int
+    context_id: int
+    buyer_id: int
+    purchased: List[int]
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Resolve forward references once at import time
+UserRead.model_rebuild()
+HumanSellerRead.model_rebuild()
+
+# Precompiled adapters for hot list serialization paths
+INFO_OFFER_LIST_ADAPTER = TypeAdapter(List[InfoOfferReadPublic])
+MATCHER_LIST_ADAPTER = TypeAdapter(List[SellerMatcherRead])
+DECISION_CTX_ADAPTER = TypeAdapter(DecisionContextRead)
+DECISION_CTX_LIST_ADAPTER = TypeAdapter(List[DecisionContextRead])
@@ -1,18 +1,38 @@
+import logging
+import os
 import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from pydantic import BaseModel
 from sqlmodel import Session, select
+from sqlalchemy import exists, func, insert, update
+from sqlalchemy.orm import joinedload, selectinload
 
 # Import the Celery app to ensure correct configuration is used
+from celery import chain, group
 from celery_app import celery
 
 from infonomy_server.database import engine
 from infonomy_server.utils import (
     recompute_inbox_for_context,
+    recompute_inbox_for_matcher,
+    remove_matcher_from_inboxes,
     increment_buyer_inspected_counter,
-    increment_buyer_purchased_counter
+    increment_buyer_purchased_counter,
+    compile_matcher,
+    matcher_sql_filters,
+    temporary_api_keys,
 )
-from infonomy_server.llm import call_llm, completion  # your wrapper around the child‐LLM
+from infonomy_server.config import (
+    BOTSELLER_MAX_WAIT_TIME,
+    BOTSELLER_POLL_INTERVAL_SLOW,
+    DEFAULT_LLM_MAX_TOKENS,
+    DEFAULT_LLM_TEMPERATURE,
+    INSPECT_MAX_OFFERS_PER_PASS,
+)
+from infonomy_server.llm import CLIENT, call_llm, completion  # your wrapper around the child‐LLM
 from infonomy_server.models import (
     DecisionContext,
     InfoOffer,
@@ -22,19 +42,166 @@ from infonomy_server.models import (
     BotSeller,
     User,
     LLMBuyerType,
+    Inspection,
 )
 from infonomy_server.logging_config import (
     celery_logger, bot_sellers_logger, inspection_logger, 
     log_celery_task, log_business_event, log_function_call, 
-    log_function_return, log_function_error, logged_function
+    log_function_return, log_function_error, logged_function, log_llm_call
 )
 
 
+@dataclass(slots=True, frozen=True)
+class BotSellerLLMResult:
+    """Internal carrier for a BotSeller LLM response (already validated by instructor)"""
+    private_info: str
+    public_info: str
+    price: float
+
+
+class BotSellerResponse(BaseModel):
+    """Structured output requested from a BotSeller's LLM"""
+    private_info: str
+    public_info: str
+    price: float
+
+
+# Identical for every bot call; sent as the system message so providers can cache the prefix
+BOT_SELLER_SYSTEM_PROMPT = """
+You are a BotSeller in an information market. The user message describes what a buyer is
+looking for, followed by your seller instructions. Provide helpful, relevant information
+based on your knowledge and the context provided.
+
+You must respond with:
+1. private_info: The actual information the buyer will receive after purchase
+2. public_info: A brief, public description of what you're offering (visible before purchase)
+3. price: A reasonable price for this information (consider the value and buyer's budget)
+
+Make sure the price is reasonable and within the buyer's max budget.
+"""
+
+BOT_SELLER_PROMPT_TEMPLATE = """
+A buyer is looking for information related to:
+
+Query: {query}
+Context Pages: {context_pages}
+Priority: {priority}
+Max Budget: {max_budget}
+
+{bot_prompt}
+"""
+
+
+def _process_bot_sellers(session: Session, context_id: int) -> List[List[tuple[int, int]]]:
+    """
+    Match a DecisionContext against the BotSeller matchers, store the fixed-info offers
+    (committed here) and return the LLM bots to run, as [(bot_seller_id, matcher_id)]
+    batches sharing an owner and model, one generate_bot_seller_offers_task each.
+    """
+    # (owner user_id, llm_model) -> [(bot_seller_id, matcher_id)], one task per bucket
+    llm_batches: Dict[tuple[int, str], List[tuple[int, int]]] = {}
+    
+    # Get the decision context
+    context = session.get(DecisionContext, context_id)
+    if not context:
+        log_business_event(celery_logger, "context_not_found", parameters={
+            "context_id": context_id
+        })
+        return []
+    
+    # The buyer is the same for every matcher, so load it once
+    buyer = session.get(HumanBuyer, context.buyer_id)
+    if not buyer:
+        return []
+    
+    # Per-context inputs to the matcher filters, computed once rather than per matcher
+    irate, prate = buyer.rates_for(context.priority)
+    query_lower = (context.query or "").lower()
+    
+    # one timestamp for the age filter and the offers' created_at
+    now = datetime.utcnow()
+    
+    # Find BotSeller matchers passing the scalar filters, with their BotSeller, in one query
+    bot_matchers = session.exec(
+        select(SellerMatcher, BotSeller)
+        .join(BotSeller, SellerMatcher.bot_seller_id == BotSeller.id)
+        .where(SellerMatcher.bot_seller_id.isnot(None))
+        .where(*matcher_sql_filters(context, irate, prate, now))
+    ).all()
+    
+    # Fixed-info offers are plain rows, so build them as dicts and insert after the loop
+    fixed_rows: List[dict] = []
+    fixed_sources: List[tuple[SellerMatcher, BotSeller]] = []
+    for matcher, bot_seller in bot_matchers:
+        try:
+            # Check the rate, keyword and context page filters (cached per matcher config)
+            if not compile_matcher(matcher)(context, query_lower, irate, prate):
+                continue
+            
+            # LLM calls are slow and independent, so run them in parallel tasks
+            if not (bot_seller.info and bot_seller.price is not None):
+                llm_batches.setdefault((bot_seller.user_id, bot_seller.llm_model), []).append(
+                    (bot_seller.id, matcher.id)
+                )
+                continue
+            
+            fixed_rows.append({
+                "bot_seller_id": bot_seller.id,
+                "context_id": context.id,
+                "private_info": bot_seller.info,
+                "public_info": f"Fixed information from BotSeller {bot_seller.id}",
+                "price": bot_seller.price,
+                "created_at": now,
+                "inspected": False,
+                "purchased": False,
+            })
+            fixed_sources.append((matcher, bot_seller))
+        except Exception as e:
+            # Log error but continue processing other bots
+            log_function_error(bot_sellers_logger, "process_bot_seller_matcher", e, {
+                "matcher_id": matcher.id,
+                "context_id": context_id
+            })
+            continue
+    
+    processed_count = len(fixed_rows)
+    if processed_count > 0:
+        # one executemany INSERT without building ORM objects; RETURNING gives the IDs for the logs
+        offer_ids = session.execute(
+            insert(InfoOffer).returning(InfoOffer.id, sort_by_parameter_order=True),
+            fixed_rows,
+        ).scalars().all()
+        for offer_id, (matcher, bot_seller) in zip(offer_ids, fixed_sources):
+            log_business_event(bot_sellers_logger, "bot_seller_offer_created", user_id=bot_seller.user_id, parameters={
+                "bot_seller_id": bot_seller.id,
+                "context_id": context_id,
+                "info_offer_id": offer_id,
+                "matcher_id": matcher.id,
+                "offer_price": bot_seller.price,
+                "bot_seller_type": "fixed_text"
+            })
+        session.commit()
+    if processed_count > 0 or llm_batches:
+        log_business_event(celery_logger, "bot_sellers_processing_complete", parameters={
+            "context_id": context_id,
+            "processed_count": processed_count,
+            "llm_bots_dispatched": sum(len(batch) for batch in llm_batches.values()),
+            "llm_batches_dispatched": len(llm_batches),
+            "total_matchers": len(bot_matchers)
+        })
+    
+    return list(llm_batches.values())
+
+
 @celery.task(bind=True)
 def process_bot_sellers_for_context(self, context_id: int):
     """
     Process all BotSellers that have matchers matching a DecisionContext.
     This task is called when a DecisionContext is submitted to seller inboxes.
+    Fixed-info bots are answered inline; LLM bots are fanned out to
+    generate_bot_seller_offers_task, one per (owner, model), and this task is
+    replaced by that group, so anything chained after it runs once every LLM
+    bot has answered.
     """
     
     # Log task start
@@ -44,65 +211,8 @@ def process_bot_sellers_for_context(self, context_id: int):
     })
     
     session = Session(engine)
-    
     try:
-        # Get the decision context
-        context = session.get(DecisionContext, context_id)
-        if not context:
-            log_business_event(celery_logger, "context_not_found", parameters={
-                "context_id": context_id
-            })
-            return
-        
-        # Find all BotSeller matchers that match this context
-        bot_matchers = session.exec(
-            select(SellerMatcher)
-            .where(SellerMatcher.bot_seller_id.isnot(None))
-        ).all()
-        
-        # Process each matching BotSeller
-        processed_count = 0
-        for matcher in bot_matchers:
-            try:
-                # Check if this matcher actually matches the context
-                if not _matcher_matches_context(matcher, context, session):
-                    continue
-                
-                # Get the BotSeller
-                bot_seller = session.get(BotSeller, matcher.bot_seller_id)
-                if not bot_seller:
-                    continue
-                
-                # Generate InfoOffer based on BotSeller type
-                info_offer = _generate_bot_seller_offer(bot_seller, context, session)
-                if info_offer:
-                    session.add(info_offer)
-                    processed_count += 1
-                    
-                    log_business_event(bot_sellers_logger, "bot_seller_offer_created", user_id=bot_seller.user_id, parameters={
-                        "bot_seller_id": bot_seller.id,
-                        "context_id": context_id,
-                        "info_offer_id": info_offer.id,
-                        "matcher_id": matcher.id,
-                        "offer_price": info_offer.price,
-                        "bot_seller_type": "fixed_text" if bot_seller.info else "llm"
-                    })
-            except Exception as e:
-                # Log error but continue processing other bots
-                log_function_error(bot_sellers_logger, "process_bot_seller_matcher", e, {
-                    "matcher_id": matcher.id,
-                    "context_id": context_id
-                })
-                continue
-        
-        if processed_count > 0:
-            session.commit()
-            log_business_event(celery_logger, "bot_sellers_processing_complete", parameters={
-                "context_id": context_id,
-                "processed_count": processed_count,
-                "total_matchers": len(bot_matchers)
-            })
-        
+        llm_batches = _process_bot_sellers(session, context_id)
     except Exception as e:
         session.rollback()
         log_function_error(celery_logger, "process_bot_sellers_for_context", e, {
@@ -111,53 +221,107 @@ def process_bot_sellers_for_context(self, context_id: int):
         raise e
     finally:
         session.close()
+    
+    if llm_batches:
+        # wall-clock is the slowest LLM call rather than the sum of them
+        return self.replace(group(
+            generate_bot_seller_offers_task.si(context_id, batch)
+            for batch in llm_batches
+        ))
 
 
-def _matcher_matches_context(matcher: SellerMatcher, context: DecisionContext, session: Session) -> bool:
-    """Check if a matcher matches a decision context"""
-    
-    buyer = session.get(HumanBuyer, context.buyer_id)
-    if not buyer:
-        return False
-    
-    # Check numeric filters
-    if context.max_budget < matcher.min_max_budget:
-        return False
-    if context.priority < matcher.min_priority:
-        return False
-    
-    # Check buyer type
-    if matcher.buyer_type and matcher.buyer_type != "human_buyer":
-        return False
-    
-    # Check rates
-    irate = buyer.inspection_rate.get(context.priority, 0.0)
-    prate = buyer.purchase_rate.get(context.priority, 0.0)
-    if irate < matcher.min_inspection_rate or prate < matcher.min_purchase_rate:
-        return False
-    
-    # Check keywords
-    if matcher.keywords is not None:
-        text = (context.query or "").lower()
-        if not any(kw.lower() in text for kw in matcher.keywords):
-            return False
+@celery.task(bind=True)
+def process_bot_sellers_for_contexts(self, context_ids: List[int]):
+    """
+    process_bot_sellers_for_context for many DecisionContexts in one task, for bulk inbox
+    recomputes. A context that fails is logged and skipped so the rest still run; the
+    LLM bots of every context are fanned out together as one group.
+    """
+    task_id = self.request.id if hasattr(self.request, 'id') else 'unknown'
+    log_celery_task(celery_logger, "process_bot_sellers_for_contexts", task_id, {
+        "context_ids": context_ids
+    })
     
-    # Check context pages
-    if matcher.context_pages is not None:
-        pages = context.context_pages or []
-        if not any(p in pages for p in matcher.context_pages):
-            return False
+    llm_tasks = []
+    with Session(engine) as session:
+        for context_id in context_ids:
+            try:
+                llm_tasks.extend(
+                    generate_bot_seller_offers_task.si(context_id, batch)
+                    for batch in _process_bot_sellers(session, context_id)
+                )
+            except Exception as e:
+                session.rollback()
+                log_function_error(celery_logger, "process_bot_sellers_for_contexts", e, {
+                    "context_id": context_id
+                })
     
-    # Check age limit
-    if matcher.age_limit is not None:
-        age_seconds = (datetime.utcnow() - context.created_at).total_seconds()
-        if age_seconds > matcher.age_limit:
-            return False
+    if llm_tasks:
+        return self.replace(group(llm_tasks))
+
+
+@celery.task(bind=True, acks_late=True, max_retries=2)
+def generate_bot_seller_offers_task(self, context_id: int, bots: List[tuple[int, int]]) -> List[int]:
+    """
+    Generate and store InfoOffers for a batch of (bot_seller_id, matcher_id) LLM BotSellers
+    that share an owner and model. The owner's API keys are set once for the batch and the
+    calls run concurrently. Matching is done by process_bot_sellers_for_context.
+    Returns the new offer IDs.
+    """
+    task_id = self.request.id if hasattr(self.request, 'id') else 'unknown'
+    log_celery_task(celery_logger, "generate_bot_seller_offers_task", task_id, {
+        "context_id": context_id,
+        "bots": bots
+    })
     
-    return True
+    with Session(engine) as session:
+        try:
+            context = session.get(DecisionContext, context_id)
+            if not context:
+                return []
+            rows = session.exec(
+                select(BotSeller, User)
+                .join(User, BotSeller.user_id == User.id)
+                .where(BotSeller.id.in_([bot_seller_id for bot_seller_id, _ in bots]))
+            ).all()
+            if not rows:
+                return []
+            bot_sellers = {bot_seller.id: bot_seller for bot_seller, _ in rows}
+            user = rows[0][1]
+            batch = [(bot_sellers[bot_seller_id], matcher_id) for bot_seller_id, matcher_id in bots if bot_seller_id in bot_sellers]
+            
+            # every bot in the batch belongs to `user`, so one set of API keys covers all the calls
+            with temporary_api_keys(user.api_keys or {}):
+                with ThreadPoolExecutor(max_workers=len(batch)) as pool:
+                    offers = list(pool.map(lambda item: _generate_bot_seller_offer(item[0], context), batch))
+            
+            created = [(offer, bot_seller, matcher_id) for offer, (bot_seller, matcher_id) in zip(offers, batch) if offer]
+            if not created:
+                return []
+            session.add_all([offer for offer, _, _ in created])
+            session.flush()
+            for offer, bot_seller, matcher_id in created:
+                log_business_event(bot_sellers_logger, "bot_seller_offer_created", user_id=bot_seller.user_id, parameters={
+                    "bot_seller_id": bot_seller.id,
+                    "context_id": context_id,
+                    "info_offer_id": offer.id,
+                    "matcher_id": matcher_id,
+                    "offer_price": offer.price,
+                    "bot_seller_type": "llm"
+                })
+            offer_ids = [offer.id for offer, _, _ in created]
+            session.commit()
+            return offer_ids
+        except Exception as e:
+            session.rollback()
+            log_function_error(bot_sellers_logger, "generate_bot_seller_offers_task", e, {
+                "context_id": context_id,
+                "bots": bots
+            })
+            raise self.retry(exc=e)
 
 
-def _generate_bot_seller_offer(bot_seller: BotSeller, context: DecisionContext, session: Session) -> Optional[InfoOffer]:
+def _generate_bot_seller_offer(bot_seller: BotSeller, context: DecisionContext) -> Optional[InfoOffer]:
     """Generate an InfoOffer from a given context"""
     
     if bot_seller.info and bot_seller.price is not None:
@@ -168,9 +332,11 @@ def _generate_bot_seller_offer(bot_seller: BotSeller, context: DecisionContext,
     elif bot_seller.llm_model and bot_seller.llm_prompt:
         # LLM bot - call the LLM to generate info
         try:
-            private_info, public_info, llm_price = _call_bot_seller_llm(bot_seller, context)
+            llm_result = _call_bot_seller_llm(bot_seller, context)
+            private_info = llm_result.private_info
+            public_info = llm_result.public_info
             # Use the price returned by the LLM, but ensure it's within budget
-            price = min(llm_price, context.max_budget)
+            price = min(llm_result.price, context.max_budget)
         except Exception as e:
             # If LLM call fails, don't create an offer
             return None
@@ -189,133 +355,92 @@ def _generate_bot_seller_offer(bot_seller: BotSeller, context: DecisionContext,
     )
 
 
-def _call_bot_seller_llm(bot_seller: BotSeller, context: DecisionContext) -> tuple[str, str, float]:
-    """Call the LLM for a BotSeller to generate information with structured response"""
-    
-    # Create a simple prompt for the bot seller
-    prompt = f"""
-You are a BotSeller in an information market. A buyer is looking for information related to:
+def _truncated_env_vars() -> dict:
+    """Environment variables for LLM call logs, with long values (e.g. API keys) truncated"""
+    env_vars = {}
+    for key_name, key_value in os.environ.items():
+        if key_value and len(key_value) > 12:
+            # Truncate long values for security (show first 8 and last 4 characters)
+            env_vars[key_name] = f"{key_value[:8]}...{key_value[-4:]}"
+        else:
+            env_vars[key_name] = key_value
+    return env_vars
 
-Query: {context.query or 'No specific query'}
-Context Pages: {context.context_pages or 'No specific context pages'}
-Priority: {context.priority}
-Max Budget: {context.max_budget}
 
-Please provide helpful, relevant information based on your knowledge and the context provided.
+def _truncate_messages(messages: List[dict], max_length: int = 200) -> List[dict]:
+    """Chat messages for LLM call logs, with long content truncated for readability"""
+    logged_messages = []
+    for msg in messages:
+        content = msg.get("content", "")
+        if isinstance(content, str) and len(content) > max_length:
+            content = content[:max_length] + "..."
+        logged_messages.append({"role": msg.get("role", "unknown"), "content": content})
+    return logged_messages
 
-{bot_seller.llm_prompt}
-
-You must respond with:
-1. private_info: The actual information the buyer will receive after purchase
-2. public_info: A brief, public description of what you're offering (visible before purchase)
-3. price: A reasonable price for this information (consider the value and buyer's budget)
 
-Make sure the price is reasonable and within the buyer's budget of {context.max_budget}.
-"""
+def _call_bot_seller_llm(bot_seller: BotSeller, context: DecisionContext) -> BotSellerLLMResult:
+    """
+    Call the LLM for a BotSeller to generate information with structured response.
+    The caller must have set the owner's API keys (see generate_bot_seller_offers_task).
+    """
+    
+    # Create a simple prompt for the bot seller
+    prompt = BOT_SELLER_PROMPT_TEMPLATE.format(
+        query=context.query or 'No specific query',
+        context_pages=context.context_pages or 'No specific context pages',
+        priority=context.priority,
+        max_budget=context.max_budget,
+        bot_prompt=bot_seller.llm_prompt,
+    )
     
     try:
-        # Get configuration values
-        try:
-            from infonomy_server.config import DEFAULT_LLM_MAX_TOKENS, DEFAULT_LLM_TEMPERATURE
-        except ImportError:
-            DEFAULT_LLM_MAX_TOKENS = 500
-            DEFAULT_LLM_TEMPERATURE = 0.7
-        
-        # Create a response model for structured output
-        from pydantic import BaseModel
-        
-        class BotSellerResponse(BaseModel):
-            private_info: str
-            public_info: str
-            price: float
+        messages = [
+            {"role": "system", "content": BOT_SELLER_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        start_time = time.time()
         
-        # Get the user to use their API keys
-        from infonomy_server.database import engine
-        from sqlmodel import Session
-        from infonomy_server.models import User
-        
-        session = Session(engine)
         try:
-            user = session.get(User, bot_seller.user_id)
-        finally:
-            session.close()
-        
-        # Use user's API keys if available, otherwise fall back to server defaults
-        api_keys = user.api_keys if user and user.api_keys else {}
-        
-        # Import the context manager and use it
-        from infonomy_server.utils import temporary_api_keys
-        from infonomy_server.llm import CLIENT
-        
-        with temporary_api_keys(api_keys):
-            import os
-            start_time = time.time()
-            
-            # Get all environment variables (within the context manager)
-            env_vars = {}
-            for key_name, key_value in os.environ.items():
-                if key_value and len(key_value) > 12:
-                    # Truncate long values for security (show first 8 and last 4 characters)
-                    env_vars[key_name] = f"{key_value[:8]}...{key_value[-4:]}"
-                else:
-                    env_vars[key_name] = key_value
-            
-            # Prepare messages for logging (truncate content for readability)
-            def truncate_content(content, max_length=200):
-                if isinstance(content, str) and len(content) > max_length:
-                    return content[:max_length] + "..."
-                return content
+            response = CLIENT.chat.completions.create(
+                model=bot_seller.llm_model,
+                response_model=BotSellerResponse,
+                messages=messages,
+                max_tokens=DEFAULT_LLM_MAX_TOKENS,
+                temperature=DEFAULT_LLM_TEMPERATURE
+            )
+            end_time = time.time()
             
-            messages = [{"role": "user", "content": prompt}]
-            logged_messages = []
-            for msg in messages:
-                logged_msg = {
-                    "role": msg.get("role", "unknown"),
-                    "content": truncate_content(msg.get("content", ""))
-                }
-                logged_messages.append(logged_msg)
+            # Log successful LLM call (messages and environment only when debugging)
+            log_params = {
+                "bot_seller_id": bot_seller.id,
+                "context_id": context.id,
+                "user_id": bot_seller.user_id,
+                "status": "success"
+            }
+            if bot_sellers_logger.isEnabledFor(logging.DEBUG):
+                log_params["messages"] = _truncate_messages(messages)
+                log_params["env_vars"] = _truncated_env_vars()
+            log_llm_call(bot_sellers_logger, bot_seller.llm_model, len(prompt), 
+                        len(str(response)), end_time - start_time, log_params)
+        except Exception as e:
+            end_time = time.time()
             
-            try:
-                response = CLIENT.chat.completions.create(
-                    model=bot_seller.llm_model,
-                    response_model=BotSellerResponse,
-                    messages=messages,
-                    max_tokens=DEFAULT_LLM_MAX_TOKENS,
-                    temperature=DEFAULT_LLM_TEMPERATURE
-                )
-                end_time = time.time()
-                
-                # Log successful LLM call
-                from infonomy_server.logging_config import log_llm_call
-                log_llm_call(bot_sellers_logger, bot_seller.llm_model, len(prompt), 
-                            len(str(response)), end_time - start_time, {
-                                "bot_seller_id": bot_seller.id,
-                                "context_id": context.id,
-                                "user_id": bot_seller.user_id,
-                                "status": "success",
-                                "messages": logged_messages,
-                                "env_vars": env_vars
-                            })
-            except Exception as e:
-                end_time = time.time()
-                
-                # Log failed LLM call
-                from infonomy_server.logging_config import log_llm_call
-                log_llm_call(bot_sellers_logger, bot_seller.llm_model, len(prompt), 
-                            0, end_time - start_time, {
-                                "bot_seller_id": bot_seller.id,
-                                "context_id": context.id,
-                                "user_id": bot_seller.user_id,
-                                "status": "failed",
-                                "error": str(e),
-                                "error_type": type(e).__name__,
-                                "messages": logged_messages,
-                                "env_vars": env_vars
-                            })
-                # Re-raise the exception
-                raise
-        
-        return response.private_info, response.public_info, response.price
+            # Log failed LLM call
+            log_llm_call(bot_sellers_logger, bot_seller.llm_model, len(prompt), 
+                        0, end_time - start_time, {
+                            "bot_seller_id": bot_seller.id,
+                            "context_id": context.id,
+                            "user_id": bot_seller.user_id,
+                            "status": "failed",
+                            "error": str(e),
+                            "error_type": type(e).__name__,
+                            "messages": _truncate_messages(messages),
+                            "env_vars": _truncated_env_vars()
+                        })
+            # Re-raise the exception
+            raise
+    
+        return BotSellerLLMResult(response.private_info, response.public_info, response.price)
         
     except Exception as e:
         # Log the error
@@ -326,7 +451,29 @@ Make sure the price is reasonable and within the buyer's budget of {context.max_
         })
         # Return fallback values if LLM call fails
         fallback_info = f"Error generating information: {str(e)}"
-        return fallback_info, "Information temporarily unavailable", 0.0
+        return BotSellerLLMResult(fallback_info, "Information temporarily unavailable", 0.0)
+
+
+def _append_purchased(session: Session, inspection: Inspection, offer_ids: List[int]) -> None:
+    """
+    Append offer IDs to inspection.purchased in SQL (SQLite json_insert), so the growing
+    JSON list isn't re-serialized from Python on every purchase.
+    """
+    if session.get_bind().dialect.name != "sqlite":
+        inspection.purchased = inspection.purchased + list(offer_ids)
+        session.add(inspection)
+        return
+    args = []
+    for offer_id in offer_ids:
+        args += ["$[#]", offer_id]
+    session.execute(
+        update(Inspection)
+        .where(Inspection.id == inspection.id)
+        .values(purchased=func.json_insert(Inspection.purchased, *args))
+        .execution_options(synchronize_session=False)
+    )
+    # reload the list on next access
+    session.expire(inspection, ["purchased"])
 
 
 @celery.task(bind=True)
@@ -334,7 +481,7 @@ def inspect_task(
     self,
     context_id: int,
     buyer_id: int,
-    purchased: Optional[List[int]] = None,
+    inspection_id: Optional[int] = None,
     depth=0,
     breadth=0,
     max_depth=3,
@@ -343,14 +490,14 @@ def inspect_task(
     """
     1) Load the context & all current InfoOffers
     2) Call LLM to choose offers or ask for a child context
-    3) If offers chosen: record them, remove from available, recurse
-    4) If child context requested: create it, recompute inbox, wait for offers, recurse
+    3) If offers chosen: record them, remove from available, repeat
+    4) If child context requested: create it, recompute inbox, and hand off to a chain that
+       runs its BotSellers and then continues the inspection on it (as this task's result)
     5) When done: return full list of purchased offer IDs
+    Purchased IDs are persisted on the Inspection row as they are bought, so a crashed
+    worker leaves an accurate record; one is created if `inspection_id` is not given.
     TODO: Right now this inspects *all* info offers, we might want to customize that later.
     """
-    if purchased is None:
-        purchased = []
-    
     # Log task start
     task_id = self.request.id if hasattr(self.request, 'id') else 'unknown'
     log_celery_task(celery_logger, "inspect_task", task_id, {
@@ -360,216 +507,300 @@ def inspect_task(
         "breadth": breadth,
         "max_depth": max_depth,
         "max_breadth": max_breadth,
-        "purchased_count": len(purchased)
+        "inspection_id": inspection_id
     })
     
-    session = Session(engine)
-    
-    try:
-        if depth >= max_depth or breadth >= max_breadth:
-            # If this is a top-level context and we're hitting limits, restore the max_budget to available_balance
-            if depth == 0:
-                # Load context & buyer to get the max_budget
-                ctx = session.get(DecisionContext, context_id)
-                buyer = session.get(HumanBuyer, buyer_id)
-                if ctx and buyer:
-                    user = session.get(User, buyer.id)
-                    if user:
-                        # Restore the max_budget to available_balance since no purchases were made
+    # set when the loop breaks out to continue the inspection on a child context
+    continuation = None
+
+    # Objects stay loaded across commits; each loop pass calls expire_all() to see other workers' writes
+    with Session(engine, expire_on_commit=False) as session:
+        try:
+            inspection = session.get(Inspection, inspection_id) if inspection_id is not None else None
+            if inspection is None:
+                inspection = Inspection(context_id=context_id, buyer_id=buyer_id)
+                session.add(inspection)
+                session.commit()
+            # kept as a plain int: the retry below runs after the session has closed
+            inspection_id = inspection.id
+
+            # Iterate instead of recursing: each pass either buys offers or pages on to the
+            # next batch (breadth + 1 either way, so max_breadth caps the LLM calls), breaks
+            # out to descend into a child context (depth + 1), or finishes
+            # the depth-0 counters are bumped once per context, however many passes it takes
+            inspected_counted = False
+            purchased_counted = False
+            while True:
+                # make sure each pass sees offers committed by other workers
+                session.expire_all()
+
+                # Load context, buyer and the buyer's User (same PK) in one statement,
+                # eager-loading what the LLM prompt and balance logic touch
+                row = session.exec(
+                    select(DecisionContext, HumanBuyer)
+                    .join(HumanBuyer, HumanBuyer.id == buyer_id)
+                    .where(DecisionContext.id == context_id)
+                    .options(selectinload(DecisionContext.parent), joinedload(HumanBuyer.user))
+                ).first()
+                ctx, buyer = row if row else (None, None)
+                user = buyer.user if buyer else None
+
+                if depth >= max_depth or breadth >= max_breadth:
+                    # If this is a top-level context and we're hitting limits, restore the max_budget to available_balance
+                    if depth == 0 and ctx and user:
+                        # Release the held max_budget (purchases were charged to balance as they were made)
                         user.available_balance += ctx.max_budget
                         session.add(user)
                         session.commit()
             
-            return purchased
-
-        # Load context & buyer
-        ctx = session.get(DecisionContext, context_id)
-        buyer = session.get(HumanBuyer, buyer_id)
-        if not ctx or not buyer:
-            return purchased or []
-
-        # 1) Fetch all available InfoOffers for this ctx
-        # not sure about whether we should let them re-inspect inspected offers
-        # but for now we do not TODO
-        offers: List[InfoOffer] = session.exec(
-            select(InfoOffer)
-            .where(InfoOffer.context_id == context_id)
-            .where(InfoOffer.purchased == False)
-            .where(InfoOffer.inspected == False)
-        ).all()
-
-        if not offers:
-            # no more offers to inspect → finish
-            # If this is a top-level context and we're done, restore the max_budget to available_balance
-            if depth == 0:
-                user = session.get(User, buyer.id)
-                if user:
-                    # Restore the max_budget to available_balance since no purchases were made
-                    user.available_balance += ctx.max_budget
-                    session.add(user)
-                    session.commit()
+                    return list(inspection.purchased)
+
+                if not ctx or not buyer:
+                    return list(inspection.purchased)
+
+                # 1) Fetch the next batch of available InfoOffers for this ctx, cheapest first,
+                # so the LLM prompt stays bounded however many offers the context attracts
+                # not sure about whether we should let them re-inspect inspected offers
+                # but for now we do not TODO
+                offers: List[InfoOffer] = session.exec(
+                    select(InfoOffer)
+                    .where(InfoOffer.context_id == context_id)
+                    .where(InfoOffer.purchased == False)
+                    .where(InfoOffer.inspected == False)
+                    .order_by(InfoOffer.price, InfoOffer.id)
+                    .limit(INSPECT_MAX_OFFERS_PER_PASS)
+                    .execution_options(populate_existing=True)
+                ).all()
+
+                if not offers:
+                    # A child context with no offers yet may still get answers from human sellers
+                    # (its BotSellers already ran before this task); check back later rather than
+                    # holding the worker, until the wait window closes
+                    if depth > 0:
+                        has_offers = session.exec(
+                            select(exists().where(InfoOffer.context_id == context_id))
+                        ).one()
+                        age_seconds = (datetime.utcnow() - ctx.created_at).total_seconds()
+                        if not has_offers and age_seconds < BOTSELLER_MAX_WAIT_TIME:
+                            break
+
+                    # no more offers to inspect → finish
+                    # If this is a top-level context and we're done, restore the max_budget to available_balance
+                    if depth == 0 and user:
+                        # Release the held max_budget (purchases were charged to balance as they were made)
+                        user.available_balance += ctx.max_budget
+                        session.add(user)
+                        session.commit()
             
-            return purchased
+                    return list(inspection.purchased)
+
+                # Claim the batch (mark it inspected) in its own short transaction before the LLM
+                # call, so concurrent inspections of the same context partition the offers
+                # instead of double-inspecting/double-charging, and no row locks are held
+                # across the call; offers another inspection claimed first are dropped
+                claimed_ids = session.execute(
+                    update(InfoOffer)
+                    .where(InfoOffer.id.in_([offer.id for offer in offers]))
+                    .where(InfoOffer.inspected == False)
+                    .values(inspected=True)
+                    .returning(InfoOffer.id)
+                ).scalars().all()
+                session.commit()
+                if not claimed_ids:
+                    continue
+                offers = session.exec(
+                    select(InfoOffer)
+                    .where(InfoOffer.id.in_(claimed_ids))
+                    .order_by(InfoOffer.price, InfoOffer.id)
+                ).all()
 
-        # just for the LLM
-        known_info: List[InfoOffer] = []
-        for p in purchased:
-            off = session.get(InfoOffer, p)
-            if off:
-                known_info.append(off)
+                # just for the LLM: everything bought so far, in one query, kept in purchase order
+                purchased_ids = list(inspection.purchased)
+                known_info: List[InfoOffer] = []
+                if purchased_ids:
+                    known_by_id = {
+                        off.id: off
+                        for off in session.exec(
+                            select(InfoOffer).where(InfoOffer.id.in_(purchased_ids))
+                        ).all()
+                    }
+                    known_info = [known_by_id[p] for p in purchased_ids if p in known_by_id]
 
-        # 2) Invoke your LLM with full, private offer data
-        #    Here we assume `call_llm` returns (chosen_offer_ids, child_ctx)
+                # 2) Invoke your LLM with full, private offer data
+                #    Here we assume `call_llm` returns (chosen_offer_ids, child_ctx)
         
-        # Get the user to pass their API keys to the LLM
-        user = session.get(User, buyer.id)
-        print(f"DEBUG: {buyer.default_child_llm}")
-        chosen_ids, child_ctx = call_llm(
-            context=ctx, 
-            offers=offers, 
-            known_info=known_info, 
-            buyer=LLMBuyerType(**buyer.default_child_llm),
-            user=user
-        )
-
-        for offer in offers:
-            offer.inspected = True
-
-        # Increment the buyer's inspected counter for this priority level
-        # Only increment once per context, not per offer
-        # AND only for the original context (depth=0), not recursive child contexts
-        if depth == 0:
-            increment_buyer_inspected_counter(buyer, ctx.priority, session)
-
-        # 3a) If LLM picked any offers → "buy" them
-        if chosen_ids:
-            for oid in chosen_ids:
-                off = session.get(InfoOffer, oid)
-                off.purchased = True
-            purchased.extend(chosen_ids)
+                # The buyer's user is passed for their API keys
+                print(f"DEBUG: {buyer.default_child_llm}")
+                try:
+                    chosen_ids, child_ctx = call_llm(
+                        context=ctx, 
+                        offers=offers, 
+                        known_info=known_info, 
+                        buyer=LLMBuyerType(**buyer.default_child_llm),
+                        user=user
+                    )
+                except Exception:
+                    # hand the claimed batch back so a later inspection can look at it
+                    session.rollback()
+                    session.execute(
+                        update(InfoOffer)
+                        .where(InfoOffer.id.in_(claimed_ids))
+                        .values(inspected=False)
+                    )
+                    session.commit()
+                    raise
+
+                # Increment the buyer's inspected counter for this priority level
+                # Only increment once per context, not per offer or per pass
+                # AND only for the original context (depth=0), not recursive child contexts
+                if depth == 0 and not inspected_counted:
+                    increment_buyer_inspected_counter(buyer, ctx.priority, session)
+                    inspected_counted = True
+
+                # 3a) If LLM picked any offers → "buy" them
+                if chosen_ids:
+                    session.execute(
+                        update(InfoOffer)
+                        .where(InfoOffer.id.in_(chosen_ids))
+                        .values(purchased=True)
+                    )
+                    # record purchases in the same transaction as the purchased flags
+                    _append_purchased(session, inspection, chosen_ids)
             
-            # Increment the buyer's purchased counter for this priority level
-            # Only increment once per context, not per offer
-            # AND only for the original context (depth=0), not recursive child contexts
-            if depth == 0:
-                increment_buyer_purchased_counter(buyer, ctx.priority, session)
+                    # Increment the buyer's purchased counter for this priority level
+                    # Only increment once per context, not per offer or per pass
+                    # AND only for the original context (depth=0), not recursive child contexts
+                    if depth == 0:
+                        if not purchased_counted:
+                            increment_buyer_purchased_counter(buyer, ctx.priority, session)
+                            purchased_counted = True
                 
-                # Handle balance logic for top-level contexts only
-                # Get the user to update their balance
-                user = session.get(User, buyer.id)
-                if user:
-                    # Calculate total cost of purchased offers
-                    total_cost = sum(off.price for off in offers if off.id in chosen_ids)
-                    # Deduct from actual balance
-                    user.balance -= total_cost
-                    # Restore the max_budget to available_balance
-                    user.available_balance += ctx.max_budget
-                    session.add(user)
+                        # Handle balance logic for top-level contexts only; the held max_budget
+                        # is released once, when the task exits
+                        if user:
+                            # Calculate total cost of purchased offers from the stored prices
+                            total_cost = session.exec(
+                                select(func.coalesce(func.sum(InfoOffer.price), 0.0))
+                                .where(InfoOffer.id.in_(chosen_ids))
+                                .where(InfoOffer.context_id == context_id)
+                            ).one()
+                            # Deduct from actual balance
+                            user.balance -= total_cost
+                            session.add(user)
             
-            # # remove those offers from future consideration
-            # session.exec(
-            #     select(InfoOffer).where(InfoOffer.id.in_(chosen_ids))
-            # ).scalars().delete(synchronize_session="fetch")
-            session.commit()
-            # recurse on the same context
-            return inspect_task(
-                context_id=context_id,
-                buyer_id=buyer_id,
-                purchased=purchased,
-                depth=depth,
-                breadth=breadth + 1,
-                max_depth=max_depth,
-                max_breadth=max_breadth,
-            )
+                    # # remove those offers from future consideration
+                    # session.exec(
+                    #     select(InfoOffer).where(InfoOffer.id.in_(chosen_ids))
+                    # ).scalars().delete(synchronize_session="fetch")
+                    session.commit()
+                    # go round again on the same context
+                    breadth += 1
+                    continue
 
-        # 3b) If LLM returned an empty list *but* wants more info
-        if child_ctx:
-            # create a new DecisionContext row
-            session.add(child_ctx)
-            session.commit()
-            session.refresh(child_ctx)
+                # 3b) If LLM returned an empty list *but* wants more info
+                if child_ctx:
+                    # create a new DecisionContext row (flushed for its ID)
+                    session.add(child_ctx)
+                    session.flush()
 
-            # notify sellers via your inbox‑recompute helper
-            recompute_inbox_for_context(child_ctx, session)
+                    # notify sellers via your inbox‑recompute helper; BotSellers run in the chain below
+                    recompute_inbox_for_context(child_ctx, session, dispatch_bot_sellers=False, commit=False)
 
-            # Process BotSellers immediately
-            try:
-                process_bot_sellers_for_context.delay(child_ctx.id)
-            except Exception as e:
-                print(f"Warning: Failed to trigger BotSeller processing: {str(e)}")
-                # Continue with the inspection process even if BotSeller processing fails
+                    # this task exits here: if this is a top-level context, restore the max_budget
+                    # to available_balance (purchases in child contexts are not charged)
+                    if depth == 0 and user:
+                        user.available_balance += ctx.max_budget
+                        session.add(user)
 
-            # wait (poll) until InfoOffers appear with a time limit instead of count
-            start_time = time.time()
-            
-            try:
-                from infonomy_server.config import (
-                    BOTSELLER_TIMEOUT_SECONDS,
-                    BOTSELLER_MAX_WAIT_TIME,
-                    BOTSELLER_POLL_INTERVAL_FAST,
-                    BOTSELLER_POLL_INTERVAL_SLOW
-                )
-            except ImportError:
-                # Fallback to default values if config is not available
-                BOTSELLER_TIMEOUT_SECONDS = 30
-                BOTSELLER_MAX_WAIT_TIME = 60
-                BOTSELLER_POLL_INTERVAL_FAST = 1
-                BOTSELLER_POLL_INTERVAL_SLOW = 3
-            
-            while True:
-                count = session.exec(
-                    select(InfoOffer)
-                    .where(InfoOffer.context_id == child_ctx.id)
-                    .where(InfoOffer.purchased == False)
-                ).count()
-                
-                elapsed_time = time.time() - start_time
-                
-                # Stop waiting if we have offers or if timeout is reached
-                if count > 0 or elapsed_time > BOTSELLER_MAX_WAIT_TIME:
+                    # one commit for the context and its inbox items, before the chain can see it
+                    session.commit()
+
+                    # descend into the child context once its BotSellers have answered
+                    # don't need to include a selection of the offers here,
+                    # because again we are inspecting all offers
+                    continuation = chain(
+                        process_bot_sellers_for_context.si(child_ctx.id),
+                        inspect_task.si(
+                            child_ctx.id,
+                            buyer_id,
+                            inspection_id=inspection_id,
+                            depth=depth + 1,
+                            breadth=breadth,
+                            max_depth=max_depth,
+                            max_breadth=max_breadth,
+                        ),
+                    )
                     break
-                
-                # For BotSellers, we expect faster response, so check more frequently early on
-                if elapsed_time < BOTSELLER_TIMEOUT_SECONDS:
-                    time.sleep(BOTSELLER_POLL_INTERVAL_FAST)  # Check every 1 second for BotSellers
-                else:
-                    time.sleep(BOTSELLER_POLL_INTERVAL_SLOW)  # Check every 3 seconds for human sellers
-            
-            # recurse into the child context
-            # don't need to include a selection of the offers here,
-            # because again we are inspecting all offers
-            return inspect_task(
-                context_id=child_ctx.id,
-                buyer_id=buyer_id,
-                purchased=purchased,
-                depth=depth + 1,
-                breadth=breadth,
-                max_depth=max_depth,
-                max_breadth=max_breadth,
-            )
 
-        # 4) Nothing to buy and no child → we're done
-        # If this is a top-level context and we're done, restore the max_budget to available_balance
-        if depth == 0:
-            user = session.get(User, buyer.user_id)
-            if user:
-                # Restore the max_budget to available_balance since no purchases were made
-                user.available_balance += ctx.max_budget
-                session.add(user)
-                session.commit()
-        
-        return purchased
+                # 4) Nothing to buy and no child: look at the next batch if this one was full
+                if len(offers) >= INSPECT_MAX_OFFERS_PER_PASS:
+                    session.commit()
+                    breadth += 1
+                    continue
+
+                # otherwise we're done
+                # If this is a top-level context and we're done, restore the max_budget to available_balance
+                if depth == 0 and user:
+                    # Release the held max_budget (purchases were charged to balance as they were made)
+                    user.available_balance += ctx.max_budget
+                    session.add(user)
+                    session.commit()
         
-    except Exception as e:
-        # Log the error
-        log_function_error(celery_logger, "inspect_task", e, {
-            "context_id": context_id,
-            "buyer_id": buyer_id,
+                return list(inspection.purchased)
+
+        except Exception as e:
+            # Log the error
+            log_function_error(celery_logger, "inspect_task", e, {
+                "context_id": context_id,
+                "buyer_id": buyer_id,
+                "depth": depth,
+                "breadth": breadth,
+                "task_id": self.request.id if hasattr(self.request, 'id') else 'unknown'
+            })
+            # Re-raise the exception so Celery can handle it
+            raise
+
+    if continuation is not None:
+        # the chain takes over this task's id, so the job's result is still the final purchased list
+        return self.replace(continuation)
+
+    # a child context is still in its wait window: re-run this step later without holding the worker
+    raise self.retry(
+        args=[context_id, buyer_id],
+        kwargs={
+            "inspection_id": inspection_id,
             "depth": depth,
             "breadth": breadth,
-            "task_id": self.request.id if hasattr(self.request, 'id') else 'unknown'
-        })
-        # Re-raise the exception so Celery can handle it
-        raise
-    finally:
-        session.close()
+            "max_depth": max_depth,
+            "max_breadth": max_breadth,
+        },
+        countdown=BOTSELLER_POLL_INTERVAL_SLOW,
+        max_retries=None,
+    )
+
+
+@celery.task(bind=True)
+def recompute_inbox_for_matcher_task(self, matcher_id: int):
+    """
+    Recompute the inbox items of one SellerMatcher in its own session, so that
+    bulk_update_matcher_inboxes can fan several matchers out across workers.
+    A matcher that no longer exists just has its inbox items removed.
+    """
+    task_id = self.request.id if hasattr(self.request, 'id') else 'unknown'
+    log_celery_task(celery_logger, "recompute_inbox_for_matcher_task", task_id, {
+        "matcher_id": matcher_id
+    })
+
+    with Session(engine) as session:
+        try:
+            matcher = session.get(SellerMatcher, matcher_id)
+            if matcher is None:
+                remove_matcher_from_inboxes(matcher_id, session)
+                return
+            recompute_inbox_for_matcher(matcher, session)
+        except Exception as e:
+            session.rollback()
+            log_function_error(celery_logger, "recompute_inbox_for_matcher_task", e, {
+                "matcher_id": matcher_id
+            })
+            raise
@@ -1,7 +1,13 @@
-from typing import List
+from typing import Any, Callable, List, Optional
 from datetime import datetime, timedelta
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Response
+from pydantic import TypeAdapter
 from sqlmodel import Session, select
+from celery import group
+from sqlalchemy import case, delete, exists, func, or_, text, tuple_
+from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from infonomy_server.database import get_db
 from infonomy_server.models import (
     User,
@@ -13,7 +19,9 @@ from infonomy_server.models import (
 )
 from infonomy_server.auth import current_active_user
 import os
+import re
 from contextlib import contextmanager
+from functools import lru_cache
 
 
 def get_context_for_buyer(
@@ -33,67 +41,195 @@ def get_context_for_buyer(
     return ctx
 
 
-def recompute_inbox_for_context(ctx: DecisionContext, db: Session):
+def adapter_json_response(adapter: TypeAdapter, objs: Any) -> Response:
     """
-    Delete any existing inbox items for this context,
-    re‑run the matcher logic, and insert fresh MatcherInbox rows.
+    Validate ORM objects through a precompiled TypeAdapter and serialize them
+    with pydantic-core's JSON writer, skipping FastAPI's jsonable_encoder pass.
     """
-    # 1) clear old items
-    db.query(MatcherInbox).filter(MatcherInbox.decision_context_id == ctx.id).delete()
-    db.commit()
+    validated = adapter.validate_python(objs, from_attributes=True)
+    return Response(content=adapter.dump_json(validated), media_type="application/json")
 
-    # 2) find candidate matchers by numeric filters
-    stmt = (
-        select(SellerMatcher)
-        .where(ctx.max_budget >= SellerMatcher.min_max_budget)
-        .where(ctx.priority >= SellerMatcher.min_priority)
+
+# (ctx, lowercased ctx.query, buyer inspection rate, buyer purchase rate) -> matches?
+MatcherPredicate = Callable[[DecisionContext, str, float, float], bool]
+
+
+def _matcher_cache_key(m: SellerMatcher) -> tuple:
+    """Matcher ID plus every field the predicate reads, so editing a matcher yields a new key"""
+    return (
+        m.id,
+        m.buyer_type,
+        m.min_max_budget,
+        m.min_priority,
+        m.min_inspection_rate,
+        m.min_purchase_rate,
+        tuple(m.keywords) if m.keywords is not None else None,
+        tuple(m.context_pages) if m.context_pages is not None else None,
+    )
+
+
+@lru_cache(maxsize=4096)
+def _compile_matcher(key: tuple) -> MatcherPredicate:
+    (
+        _matcher_id,
+        buyer_type,
+        min_max_budget,
+        min_priority,
+        min_inspection_rate,
+        min_purchase_rate,
+        keywords,
+        context_pages,
+    ) = key
+    buyer_type_ok = not buyer_type or buyer_type == "human_buyer"
+    # one alternation over all keywords: a single C-level scan of the query instead of a
+    # Python loop of substring tests (an empty keyword list matches nothing, as before)
+    keyword_pattern = (
+        re.compile("|".join(re.escape(kw.lower()) for kw in keywords)) if keywords else None
     )
-    all_matchers: List[SellerMatcher] = db.exec(stmt).all()
+    page_set = frozenset(context_pages) if context_pages is not None else None
+
+    def predicate(ctx: DecisionContext, query_lower: str, irate: float, prate: float) -> bool:
+        if not buyer_type_ok:
+            return False
+        if ctx.max_budget < min_max_budget or ctx.priority < min_priority:
+            return False
+        if irate < min_inspection_rate or prate < min_purchase_rate:
+            return False
+        if keywords is not None and (keyword_pattern is None or keyword_pattern.search(query_lower) is None):
+            return False
+        if page_set is not None and page_set.isdisjoint(ctx.context_pages or ()):
+            return False
+        return True
+
+    return predicate
+
+
+def compile_matcher(m: SellerMatcher) -> MatcherPredicate:
+    """
+    Get the compiled predicate for a matcher's budget, priority, buyer type, rate,
+    keyword and context page filters (age limit is checked separately).
+    Predicates are cached by matcher ID and configuration, so updates invalidate them.
+    Callers lowercase the context's query once and pass it to every predicate.
+    """
+    return _compile_matcher(_matcher_cache_key(m))
+
+
+def matcher_sql_filters(ctx: DecisionContext, irate: float, prate: float, now: datetime) -> list:
+    """
+    WHERE clauses for the scalar matcher filters (budget, priority, buyer type, rates):
+    the SQL side of compile_matcher's predicate, for prefiltering SellerMatcher rows.
+    Also applies the age limit as of now: a context matches while it is at most
+    age_limit seconds old, the same cutoff the per-matcher recomputes use.
+    """
+    age_seconds = (now - ctx.created_at).total_seconds()
+    return [
+        or_(SellerMatcher.age_limit.is_(None), SellerMatcher.age_limit >= age_seconds),
+        SellerMatcher.min_max_budget <= ctx.max_budget,
+        SellerMatcher.min_priority <= ctx.priority,
+        or_(SellerMatcher.buyer_type.is_(None), SellerMatcher.buyer_type == "human_buyer"),
+        SellerMatcher.min_inspection_rate <= irate,
+        SellerMatcher.min_purchase_rate <= prate,
+    ]
+
+
+# Rows per batch when streaming matchers/contexts through the recompute loops
+RECOMPUTE_BATCH_SIZE = 500
+
+# Contexts per process_bot_sellers_for_contexts message when a recompute touches many
+BOT_SELLER_DISPATCH_CHUNK = 1000
+
+
+def _dispatch_bot_sellers(context_ids: List[int]) -> None:
+    """Send BotSeller processing for many contexts as a few multi-context tasks"""
+    if not context_ids:
+        return
+    from infonomy_server.tasks import process_bot_sellers_for_contexts
+    group(
+        process_bot_sellers_for_contexts.si(context_ids[i:i + BOT_SELLER_DISPATCH_CHUNK])
+        for i in range(0, len(context_ids), BOT_SELLER_DISPATCH_CHUNK)
+    ).apply_async()
 
-    # 3) full Python matching (rates, keywords, contexts, buyer_type)
+
+def _upsert_inbox_items(db: Session, rows: List[dict]) -> None:
+    """
+    Insert MatcherInbox rows in one statement; a (matcher, context) pair that is already
+    in an inbox only gets its expiry refreshed, so its status survives a recompute.
+    """
+    if not rows:
+        return
+    dialect_insert = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(MatcherInbox)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["matcher_id", "decision_context_id"],
+            set_={"expires_at": stmt.excluded.expires_at},
+        ),
+        rows,
+    )
+
+
+def recompute_inbox_for_context(
+    ctx: DecisionContext,
+    db: Session,
+    dispatch_bot_sellers: bool = True,
+    commit: bool = True,
+):
+    """
+    Re‑run the matcher logic for this context, upsert MatcherInbox rows for the matches
+    and delete the context's items for matchers that no longer match.
+    Pass dispatch_bot_sellers=False if the caller schedules BotSeller processing itself,
+    and commit=False to only flush, leaving the caller to commit (before any BotSellers run).
+    """
+    # one timestamp for the whole batch, used for both the age cutoff and the inbox rows
+    now = datetime.utcnow()
+
+    # 1) find candidate matchers by the scalar filters (age, budget, priority, buyer_type, rates)
     buyer: HumanBuyer = ctx.buyer
-    new_items: List[MatcherInbox] = []
+    irate, prate = buyer.rates_for(ctx.priority)
+    stmt = select(SellerMatcher).where(*matcher_sql_filters(ctx, irate, prate, now))
+    # streamed in batches rather than materialized as one list
+    all_matchers = db.exec(stmt.execution_options(yield_per=RECOMPUTE_BATCH_SIZE))
+
+    # 2) Python matching for the JSON filters (keywords, contexts) via compiled predicates
+    query_lower = (ctx.query or "").lower()
+    rows: List[dict] = []
     for m in all_matchers:
-        # buyer_type
-        if m.buyer_type and m.buyer_type != "human_buyer":
-            continue
-
-        # rates
-        irate = buyer.inspection_rate.get(ctx.priority, 0.0)
-        prate = buyer.purchase_rate.get(ctx.priority, 0.0)
-        if irate < m.min_inspection_rate or prate < m.min_purchase_rate:
+        if not compile_matcher(m)(ctx, query_lower, irate, prate):
             continue
-
-        # keywords
-        if m.keywords is not None:
-            text = (ctx.query or "").lower()
-            if not any(kw.lower() in text for kw in m.keywords):
-                continue
-
-        # contexts
-        if m.context_pages is not None:
-            pages = ctx.context_pages or []
-            if not any(p in pages for p in m.context_pages):
-                continue
-        now = datetime.utcnow()
-        new_items.append(
-            MatcherInbox(
-                matcher_id=m.id,
-                decision_context_id=ctx.id,
-                status="new",
-                created_at=now,
-                expires_at=now + timedelta(seconds=m.age_limit),
-            )
+        rows.append({
+            "matcher_id": m.id,
+            "decision_context_id": ctx.id,
+            "status": "new",
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=m.age_limit),
+        })
+
+    # 3) diff against the context's current items and only write the difference, in one
+    # transaction (a no-op recompute issues no writes at all)
+    existing_ids = set(
+        db.exec(
+            select(MatcherInbox.matcher_id).where(MatcherInbox.decision_context_id == ctx.id)
+        ).all()
+    )
+    matched_ids = {row["matcher_id"] for row in rows}
+    to_remove = existing_ids - matched_ids
+    if to_remove:
+        db.execute(
+            delete(MatcherInbox)
+            .where(MatcherInbox.decision_context_id == ctx.id)
+            .where(MatcherInbox.matcher_id.in_(to_remove))
+            .execution_options(synchronize_session=False)
         )
-
-    # 4) bulk‐insert fresh inbox items
-    if new_items:
-        db.add_all(new_items)
+    _upsert_inbox_items(db, [row for row in rows if row["matcher_id"] not in existing_ids])
+    if commit:
         db.commit()
+    else:
+        db.flush()
     
-    # 5) Trigger BotSeller processing for this context
-    from infonomy_server.tasks import process_bot_sellers_for_context
-    process_bot_sellers_for_context.delay(ctx.id)
+    # 4) Trigger BotSeller processing for this context
+    if dispatch_bot_sellers:
+        from infonomy_server.tasks import process_bot_sellers_for_context
+        process_bot_sellers_for_context.delay(ctx.id)
 
 
 def recompute_inbox_for_matcher(matcher: SellerMatcher, db: Session):
@@ -101,77 +237,67 @@ def recompute_inbox_for_matcher(matcher: SellerMatcher, db: Session):
     Efficiently recompute inbox items for a specific matcher.
     This is called when a matcher is created, updated, or deleted.
     """
-    # 1) Clear existing inbox items for this matcher
-    db.query(MatcherInbox).filter(MatcherInbox.matcher_id == matcher.id).delete()
-    
-    # 2) Find all decision contexts that this matcher should match against
+    # one timestamp for the whole batch, used for both the age cutoff and the inbox rows
+    now = datetime.utcnow()
+
+    # 1) Find all decision contexts that this matcher should match against, with their
+    # buyers in one extra query rather than one lazy load per context; recursive contexts
+    # are skipped (they are handled by their parent context)
     stmt = (
         select(DecisionContext)
+        .options(selectinload(DecisionContext.buyer))
+        .where(DecisionContext.parent_id.is_(None))
         .where(DecisionContext.max_budget >= matcher.min_max_budget)
         .where(DecisionContext.priority >= matcher.min_priority)
     )
-    candidate_contexts = db.exec(stmt).all()
-    
-    # 3) Apply full matching logic to each candidate context
-    new_items = []
+    # age limit check (CRITICAL: was missing!), as a created_at cutoff computed once
+    if matcher.age_limit is not None:
+        stmt = stmt.where(DecisionContext.created_at >= now - timedelta(seconds=matcher.age_limit))
+    # streamed in batches rather than materialized as one list
+    candidate_contexts = db.exec(stmt.execution_options(yield_per=RECOMPUTE_BATCH_SIZE))
+    
+    # 2) Apply full matching logic to each candidate context
+    rows: List[dict] = []
+    # buyer_type, rates, keywords and contexts checks; keywords are lowercased and
+    # compiled once per matcher config, not per context
+    predicate = compile_matcher(matcher)
+    candidate_ids: List[int] = []
     for ctx in candidate_contexts:
-        # Skip if this is a recursive context (should be handled by parent context)
-        if ctx.parent_id is not None:
+        candidate_ids.append(ctx.id)
+        irate, prate = ctx.buyer.rates_for(ctx.priority)
+        if not predicate(ctx, (ctx.query or "").lower(), irate, prate):
             continue
-            
-        buyer = ctx.buyer
-        
-        # buyer_type check
-        if matcher.buyer_type and matcher.buyer_type != "human_buyer":
-            continue
-            
-        # rates check
-        irate = buyer.inspection_rate.get(ctx.priority, 0.0)
-        prate = buyer.purchase_rate.get(ctx.priority, 0.0)
-        if irate < matcher.min_inspection_rate or prate < matcher.min_purchase_rate:
-            continue
-            
-        # keywords check
-        if matcher.keywords is not None:
-            text = (ctx.query or "").lower()
-            if not any(kw.lower() in text for kw in matcher.keywords):
-                continue
-                
-        # contexts check
-        if matcher.context_pages is not None:
-            pages = ctx.context_pages or []
-            if not any(p in pages for p in matcher.context_pages):
-                continue
-                
-        # age limit check (CRITICAL: was missing!)
-        if matcher.age_limit is not None:
-            age_seconds = (datetime.utcnow() - ctx.created_at).total_seconds()
-            if age_seconds > matcher.age_limit:
-                continue
                 
         # Create inbox item
-        now = datetime.utcnow()
-        new_items.append(
-            MatcherInbox(
-                matcher_id=matcher.id,
-                decision_context_id=ctx.id,
-                status="new",
-                created_at=now,
-                expires_at=now + timedelta(seconds=matcher.age_limit),
-            )
+        rows.append({
+            "matcher_id": matcher.id,
+            "decision_context_id": ctx.id,
+            "status": "new",
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=matcher.age_limit),
+        })
+    
+    # 3) Drop items for contexts that no longer match, upsert the rest (all of them: an
+    # edited age_limit changes every item's expiry)
+    existing_ids = set(
+        db.exec(
+            select(MatcherInbox.decision_context_id).where(MatcherInbox.matcher_id == matcher.id)
+        ).all()
+    )
+    to_remove = existing_ids - {row["decision_context_id"] for row in rows}
+    if to_remove:
+        db.execute(
+            delete(MatcherInbox)
+            .where(MatcherInbox.matcher_id == matcher.id)
+            .where(MatcherInbox.decision_context_id.in_(to_remove))
+            .execution_options(synchronize_session=False)
         )
+    _upsert_inbox_items(db, rows)
+    db.commit()
     
-    # 4) Bulk insert new inbox items
-    if new_items:
-        db.add_all(new_items)
-        db.commit()
-    
-    # 5) Trigger BotSeller processing for affected contexts if this is a bot seller matcher
+    # 4) Trigger BotSeller processing for affected contexts if this is a bot seller matcher
     if matcher.seller_type == "bot_seller":
-        from infonomy_server.tasks import process_bot_sellers_for_context
-        for ctx in candidate_contexts:
-            if ctx.parent_id is None:  # Only process non-recursive contexts
-                process_bot_sellers_for_context.delay(ctx.id)
+        _dispatch_bot_sellers(candidate_ids)
 
 
 def recompute_all_inboxes(db: Session):
@@ -179,18 +305,76 @@ def recompute_all_inboxes(db: Session):
     Recompute all inboxes for all decision contexts.
     This is useful for bulk operations or when the system needs to be resynchronized.
     Use sparingly as it can be expensive.
+    Only top-level contexts are resynced: inbox items of recursive child contexts are
+    left as they are (they were matched when inspect_task created the child, and are
+    removed once they expire by cleanup_expired_inbox_items).
     """
-    # Get all non-recursive decision contexts
-    stmt = select(DecisionContext).where(DecisionContext.parent_id.is_(None))
-    contexts = db.exec(stmt).all()
-    
-    # Clear all existing inbox items
-    db.query(MatcherInbox).delete()
+    # one timestamp for the whole run, used for both the age cutoffs and the inbox rows
+    now = datetime.utcnow()
+
+    # 1) Get all matchers once, with their compiled predicates and created_at cutoffs,
+    # and stream the non-recursive decision contexts with their buyers
+    matchers = [
+        (
+            m,
+            compile_matcher(m),
+            now - timedelta(seconds=m.age_limit) if m.age_limit is not None else None,
+        )
+        for m in db.exec(select(SellerMatcher)).all()
+    ]
+    stmt = (
+        select(DecisionContext)
+        .options(selectinload(DecisionContext.buyer))
+        .where(DecisionContext.parent_id.is_(None))
+        .execution_options(yield_per=RECOMPUTE_BATCH_SIZE)
+    )
+
+    # 2) One batch of contexts at a time: match in memory with the same predicates and age
+    # check as the per-context and per-matcher recomputes, then diff against the batch's
+    # current items, so memory stays bounded and existing items keep their status
+    context_ids: List[int] = []
+    for batch in db.exec(stmt).partitions():
+        rows: List[dict] = []
+        batch_ids: List[int] = []
+        for ctx in batch:
+            batch_ids.append(ctx.id)
+            irate, prate = ctx.buyer.rates_for(ctx.priority)
+            query_lower = (ctx.query or "").lower()
+            for m, predicate, cutoff in matchers:
+                if cutoff is not None and ctx.created_at < cutoff:
+                    continue
+                if not predicate(ctx, query_lower, irate, prate):
+                    continue
+                rows.append({
+                    "matcher_id": m.id,
+                    "decision_context_id": ctx.id,
+                    "status": "new",
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=m.age_limit),
+                })
+
+        # drop the batch's items for pairs that no longer match, upsert the rest
+        existing_pairs = set(
+            db.exec(
+                select(MatcherInbox.matcher_id, MatcherInbox.decision_context_id)
+                .where(MatcherInbox.decision_context_id.in_(batch_ids))
+            ).all()
+        )
+        stale_pairs = existing_pairs - {(row["matcher_id"], row["decision_context_id"]) for row in rows}
+        if stale_pairs:
+            db.execute(
+                delete(MatcherInbox)
+                .where(tuple_(MatcherInbox.matcher_id, MatcherInbox.decision_context_id).in_(stale_pairs))
+                .execution_options(synchronize_session=False)
+            )
+        _upsert_inbox_items(db, rows)
+        context_ids.extend(batch_ids)
+
+    # one commit for the whole resync
     db.commit()
-    
-    # Recompute inbox for each context
-    for ctx in contexts:
-        recompute_inbox_for_context(ctx, db)
+
+    # 3) Trigger BotSeller processing for every context in one dispatch
+    _dispatch_bot_sellers(context_ids)
 
 
 def remove_matcher_from_inboxes(matcher_id: int, db: Session):
@@ -198,7 +382,11 @@ def remove_matcher_from_inboxes(matcher_id: int, db: Session):
     Remove all inbox items for a specific matcher.
     This is called when a matcher is deleted.
     """
-    db.query(MatcherInbox).filter(MatcherInbox.matcher_id == matcher_id).delete()
+    db.execute(
+        delete(MatcherInbox)
+        .where(MatcherInbox.matcher_id == matcher_id)
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
 
 
@@ -220,18 +408,14 @@ def bulk_update_matcher_inboxes(matcher_ids: List[int], db: Session):
     """
     Efficiently update inboxes for multiple matchers at once.
     This is useful when multiple matchers are updated simultaneously.
+    Each matcher is recomputed by its own Celery task, so they run in parallel;
+    db is unused and kept for the existing call signature.
     """
-    # Get all the matchers
-    stmt = select(SellerMatcher).where(SellerMatcher.id.in_(matcher_ids))
-    matchers = db.exec(stmt).all()
-    
-    # Clear inbox items for all affected matchers
-    db.query(MatcherInbox).filter(MatcherInbox.matcher_id.in_(matcher_ids)).delete()
-    db.commit()
-    
-    # Recompute inbox for each matcher
-    for matcher in matchers:
-        recompute_inbox_for_matcher(matcher, db)
+    # Recompute inbox for each matcher; each task diffs against that matcher's current
+    # items, so there is nothing to clear up front
+    from infonomy_server.tasks import recompute_inbox_for_matcher_task
+    if matcher_ids:
+        group(recompute_inbox_for_matcher_task.si(matcher_id) for matcher_id in matcher_ids).apply_async()
 
 
 def get_matcher_impact_summary(matcher: SellerMatcher, db: Session) -> dict:
@@ -239,31 +423,30 @@ def get_matcher_impact_summary(matcher: SellerMatcher, db: Session) -> dict:
     Get a summary of the impact of a matcher change.
     This helps users understand how many decision contexts will be affected.
     """
-    affected_contexts = get_affected_decision_contexts_for_matcher(matcher, db)
+    # Count affected contexts by priority and budget range in SQL, without loading them
+    budget_range = case(
+        (DecisionContext.max_budget <= 10, "low"),      # 0-10
+        (DecisionContext.max_budget <= 50, "medium"),   # 10-50
+        else_="high",                                   # 50+
+    ).label("budget_range")
+    rows = db.exec(
+        select(DecisionContext.priority, budget_range, func.count())
+        .where(DecisionContext.max_budget >= matcher.min_max_budget)
+        .where(DecisionContext.priority >= matcher.min_priority)
+        .where(DecisionContext.parent_id.is_(None))  # Only non-recursive contexts
+        .group_by(DecisionContext.priority, budget_range)
+    ).all()
     
-    # Count contexts by priority
+    total_affected_contexts = 0
     priority_counts = {}
-    for ctx in affected_contexts:
-        priority = ctx.priority
-        priority_counts[priority] = priority_counts.get(priority, 0) + 1
-    
-    # Count contexts by budget range
-    budget_ranges = {
-        "low": 0,      # 0-10
-        "medium": 0,   # 10-50  
-        "high": 0      # 50+
-    }
-    
-    for ctx in affected_contexts:
-        if ctx.max_budget <= 10:
-            budget_ranges["low"] += 1
-        elif ctx.max_budget <= 50:
-            budget_ranges["medium"] += 1
-        else:
-            budget_ranges["high"] += 1
+    budget_ranges = {"low": 0, "medium": 0, "high": 0}
+    for priority, budget_bucket, count in rows:
+        total_affected_contexts += count
+        priority_counts[priority] = priority_counts.get(priority, 0) + count
+        budget_ranges[budget_bucket] += count
     
     return {
-        "total_affected_contexts": len(affected_contexts),
+        "total_affected_contexts": total_affected_contexts,
         "priority_distribution": priority_counts,
         "budget_distribution": budget_ranges,
         "matcher_criteria": {
@@ -282,7 +465,11 @@ def cleanup_expired_inbox_items(db: Session):
     This should be run periodically (e.g., via a cron job).
     """
     now = datetime.utcnow()
-    expired_count = db.query(MatcherInbox).filter(MatcherInbox.expires_at < now).delete()
+    expired_count = db.execute(
+        delete(MatcherInbox)
+        .where(MatcherInbox.expires_at < now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
     db.commit()
     return expired_count
 
@@ -292,18 +479,27 @@ def get_inbox_statistics(db: Session) -> dict:
     Get statistics about the current inbox state.
     Useful for monitoring and debugging.
     """
-    total_inbox_items = db.query(MatcherInbox).count()
-    new_items = db.query(MatcherInbox).filter(MatcherInbox.status == "new").count()
-    ignored_items = db.query(MatcherInbox).filter(MatcherInbox.status == "ignored").count()
-    responded_items = db.query(MatcherInbox).filter(MatcherInbox.status == "responded").count()
-    
-    # Count by matcher type
-    human_matcher_items = db.query(MatcherInbox).join(SellerMatcher).filter(
-        SellerMatcher.human_seller_id.isnot(None)
-    ).count()
-    bot_matcher_items = db.query(MatcherInbox).join(SellerMatcher).filter(
-        SellerMatcher.bot_seller_id.isnot(None)
-    ).count()
+    # All counts in one scan: total, by status, and by matcher type (outer join, so the
+    # total still counts items whose matcher row is gone)
+    (
+        total_inbox_items,
+        new_items,
+        ignored_items,
+        responded_items,
+        human_matcher_items,
+        bot_matcher_items,
+    ) = db.exec(
+        select(
+            func.count(),
+            func.count().filter(MatcherInbox.status == "new"),
+            func.count().filter(MatcherInbox.status == "ignored"),
+            func.count().filter(MatcherInbox.status == "responded"),
+            func.count().filter(SellerMatcher.human_seller_id.isnot(None)),
+            func.count().filter(SellerMatcher.bot_seller_id.isnot(None)),
+        )
+        .select_from(MatcherInbox)
+        .outerjoin(SellerMatcher, MatcherInbox.matcher_id == SellerMatcher.id)
+    ).one()
     
     return {
         "total_inbox_items": total_inbox_items,
@@ -364,18 +560,22 @@ def optimize_matcher_performance(db: Session):
     This should be run periodically during low-traffic periods.
     """
     # Analyze table statistics
-    db.execute("ANALYZE matcherinbox")
-    db.execute("ANALYZE sellermatcher") 
-    db.execute("ANALYZE decisioncontext")
-    
-    # Clean up any orphaned inbox items
-    orphaned_count = db.query(MatcherInbox).outerjoin(SellerMatcher).filter(
-        SellerMatcher.id.is_(None)
-    ).delete()
-    
-    orphaned_context_count = db.query(MatcherInbox).outerjoin(DecisionContext).filter(
-        DecisionContext.id.is_(None)
-    ).delete()
+    db.execute(text("ANALYZE matcherinbox"))
+    db.execute(text("ANALYZE sellermatcher"))
+    db.execute(text("ANALYZE decisioncontext"))
+    
+    # Clean up any orphaned inbox items (NOT EXISTS, since DELETE can't take a join)
+    orphaned_count = db.execute(
+        delete(MatcherInbox)
+        .where(~exists().where(SellerMatcher.id == MatcherInbox.matcher_id))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    
+    orphaned_context_count = db.execute(
+        delete(MatcherInbox)
+        .where(~exists().where(DecisionContext.id == MatcherInbox.decision_context_id))
+        .execution_options(synchronize_session=False)
+    ).rowcount
     
     db.commit()
     
@@ -385,15 +585,24 @@ def optimize_matcher_performance(db: Session):
     }
 
 
+def _bump_counter(counts: Optional[dict], priority: int) -> dict:
+    """
+    Copy of a per-priority counter with one priority incremented. A new dict, so the
+    JSON column is marked dirty (in-place edits are not tracked); keys are stored as
+    strings, as the column round-trips them anyway.
+    """
+    bumped = {str(k): v for k, v in (counts or {}).items()}
+    key = str(priority)
+    bumped[key] = bumped.get(key, 0) + 1
+    return bumped
+
+
 def increment_buyer_query_counter(buyer: HumanBuyer, priority: int, db: Session):
     """
     Increment the num_queries counter for a specific priority level.
     This is called when a buyer creates a new DecisionContext.
     """
-    if buyer.num_queries is None:
-        buyer.num_queries = {}
-    
-    buyer.num_queries[priority] = buyer.num_queries.get(priority, 0) + 1
+    buyer.num_queries = _bump_counter(buyer.num_queries, priority)
     db.add(buyer)
     db.commit()
 
@@ -406,10 +615,7 @@ def increment_buyer_inspected_counter(buyer: HumanBuyer, priority: int, db: Sess
     IMPORTANT: This should only be called for the ORIGINAL DecisionContext (depth=0),
     not for recursive child contexts. The inspection task handles this automatically.
     """
-    if buyer.num_inspected is None:
-        buyer.num_inspected = {}
-    
-    buyer.num_inspected[priority] = buyer.num_inspected.get(priority, 0) + 1
+    buyer.num_inspected = _bump_counter(buyer.num_inspected, priority)
     db.add(buyer)
     db.commit()
 
@@ -422,10 +628,7 @@ def increment_buyer_purchased_counter(buyer: HumanBuyer, priority: int, db: Sess
     IMPORTANT: This should only be called for the ORIGINAL DecisionContext (depth=0),
     not for recursive child contexts. The inspection task handles this automatically.
     """
-    if buyer.num_purchased is None:
-        buyer.num_purchased = {}
-    
-    buyer.num_purchased[priority] = buyer.num_purchased.get(priority, 0) + 1
+    buyer.num_purchased = _bump_counter(buyer.num_purchased, priority)
     db.add(buyer)
     db.commit()
 
@@ -523,6 +726,8 @@ def process_daily_login_bonus(user: User, db: Session) -> dict:
 def temporary_api_keys(api_keys: dict):
     """
     Context manager to temporarily set API keys in environment variables.
+    The environment is process-wide, so this is only safe with one task per process
+    (Celery's prefork pool), not under gevent/eventlet.
     
     Args:
         api_keys: Dictionary of API key names and values
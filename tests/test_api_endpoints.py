@@ -4,7 +4,8 @@ These tests use the FastAPI test client with database fixtures.
 """
 
 import pytest
-from fastapi import status
+from types import SimpleNamespace
+from fastapi import HTTPException, status
 
 
 @pytest.mark.api
@@ -162,4 +163,29 @@ class TestErrorHandling:
         )
         
         # Should return 422 (validation error) or 401 (unauthorized)
-        assert response.status_code in [status.HTTP_422_UNPROCESSABLE_ENTITY, status.HTTP_401_UNAUTHORIZED]
\ No newline at end of file
+        assert response.status_code in [status.HTTP_422_UNPROCESSABLE_ENTITY, status.HTTP_401_UNAUTHORIZED]
+
+@pytest.mark.api
+class TestInspectionEndpoints:
+    """Test inspection-related API endpoints, called directly with the test session."""
+    
+    def test_get_inspection_is_owner_only(self, test_db, sample_buyer, sample_decision_context):
+        """Test that another user's inspection reads as not found."""
+        from infonomy_server.models import Inspection
+        from infonomy_server.routers.inspection import get_inspection
+        
+        inspection = Inspection(context_id=sample_decision_context.id, buyer_id=sample_buyer.id)
+        test_db.add(inspection)
+        test_db.commit()
+        
+        owner = SimpleNamespace(id=sample_buyer.id)
+        assert get_inspection(inspection.id, db=test_db, current_user=owner).id == inspection.id
+        
+        other_user = SimpleNamespace(id=sample_buyer.id + 1)
+        with pytest.raises(HTTPException) as exc_info:
+            get_inspection(inspection.id, db=test_db, current_user=other_user)
+        assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
+        
+        with pytest.raises(HTTPException) as exc_info:
+            get_inspection(inspection.id + 1, db=test_db, current_user=owner)
+        assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
@@ -5,7 +5,7 @@ These tests focus on pure business logic without database dependencies.
 
 import pytest
 from unittest.mock import Mock, patch
-from infonomy_server.models import User, DecisionContext, InfoOffer
+from infonomy_server.models import User, DecisionContext, InfoOffer, SellerMatcher
 
 
 @pytest.mark.unit
@@ -168,6 +168,60 @@ class TestMatcherLogic:
         assert high_priority_matcher.priority < low_priority_matcher.priority
 
 
+@pytest.mark.unit
+class TestCompiledMatcher:
+    """Test the cached matcher predicates used by inbox recomputation."""
+    
+    def test_compiled_matcher_filters(self):
+        """Test that compiled predicates apply keyword, page and rate filters."""
+        from infonomy_server.utils import compile_matcher
+        
+        matcher = SellerMatcher(
+            id=1,
+            keywords=["AI", "Safety"],
+            context_pages=["https://example.com/a"],
+            min_inspection_rate=0.5,
+        )
+        context = DecisionContext(
+            buyer_id=1,
+            query="Latest AI developments",
+            context_pages=["https://example.com/a", "https://example.com/b"],
+            max_budget=10.0,
+            priority=1
+        )
+        
+        predicate = compile_matcher(matcher)
+        query_lower = context.query.lower()
+        assert predicate(context, query_lower, 0.6, 0.0) is True
+        assert predicate(context, query_lower, 0.4, 0.0) is False
+        
+        context.context_pages = ["https://example.com/c"]
+        assert predicate(context, query_lower, 0.6, 0.0) is False
+    
+    def test_compiled_matcher_invalidated_on_update(self):
+        """Test that editing a matcher yields a fresh predicate."""
+        from infonomy_server.utils import compile_matcher
+        
+        matcher = SellerMatcher(id=2, keywords=["weather"])
+        context = DecisionContext(buyer_id=1, query="Will it rain?", max_budget=10.0, priority=0)
+        assert compile_matcher(matcher)(context, "will it rain?", 0.0, 0.0) is False
+        
+        matcher.keywords = ["rain"]
+        assert compile_matcher(matcher)(context, "will it rain?", 0.0, 0.0) is True
+    
+    def test_compiled_matcher_keywords_are_literal(self):
+        """Test that keywords containing regex metacharacters match literally."""
+        from infonomy_server.utils import compile_matcher
+        
+        matcher = SellerMatcher(id=3, keywords=["C++", "a.b"])
+        context = DecisionContext(buyer_id=1, query="Is C++ still popular?", max_budget=10.0, priority=0)
+        assert compile_matcher(matcher)(context, "is c++ still popular?", 0.0, 0.0) is True
+        assert compile_matcher(matcher)(context, "is axb popular?", 0.0, 0.0) is False
+        
+        matcher.keywords = []
+        assert compile_matcher(matcher)(context, "is c++ still popular?", 0.0, 0.0) is False
+
+
 @pytest.mark.unit
 class TestBotSellerLogic:
     """Test BotSeller business logic."""
@@ -4,8 +4,12 @@ These tests use a real database but with proper isolation.
 """
 
 import pytest
+from unittest.mock import patch
 from sqlmodel import select
-from infonomy_server.models import User, HumanBuyer, HumanSeller, DecisionContext, InfoOffer
+from datetime import datetime, timedelta
+from infonomy_server.models import (
+    User, HumanBuyer, HumanSeller, DecisionContext, InfoOffer, SellerMatcher, MatcherInbox
+)
 
 
 @pytest.mark.integration
@@ -171,4 +175,94 @@ class TestBusinessLogic:
         
         # Verify purchase
         assert sample_user.balance == 75.0  # 100 - 25
-        assert sample_info_offer.purchased is True
\ No newline at end of file
+        assert sample_info_offer.purchased is True
+
+
+@pytest.mark.integration
+class TestInboxRecompute:
+    """Test that inbox recomputes keep surviving items and drop stale ones."""
+    
+    @staticmethod
+    def _add_item(test_db, matcher_id, context_id, status="new"):
+        now = datetime.utcnow()
+        test_db.add(MatcherInbox(
+            matcher_id=matcher_id,
+            decision_context_id=context_id,
+            status=status,
+            expires_at=now + timedelta(days=1),
+        ))
+        test_db.commit()
+    
+    @staticmethod
+    def _items(test_db):
+        return dict(
+            ((matcher_id, context_id), status)
+            for matcher_id, context_id, status in test_db.exec(
+                select(MatcherInbox.matcher_id, MatcherInbox.decision_context_id, MatcherInbox.status)
+            ).all()
+        )
+    
+    def test_recompute_for_context(self, test_db, sample_seller, sample_decision_context):
+        """Test the per-context recompute keeps statuses and deletes pairs that no longer match."""
+        from infonomy_server.utils import recompute_inbox_for_context
+        
+        matching = SellerMatcher(human_seller_id=sample_seller.id, keywords=["safety"])
+        stale = SellerMatcher(human_seller_id=sample_seller.id, keywords=["weather"])
+        test_db.add(matching)
+        test_db.add(stale)
+        test_db.commit()
+        ctx_id = sample_decision_context.id
+        self._add_item(test_db, matching.id, ctx_id, status="ignored")
+        self._add_item(test_db, stale.id, ctx_id)
+        
+        recompute_inbox_for_context(sample_decision_context, test_db, dispatch_bot_sellers=False)
+        
+        assert self._items(test_db) == {(matching.id, ctx_id): "ignored"}
+    
+    def test_recompute_for_matcher(self, test_db, sample_buyer, sample_seller, sample_decision_context):
+        """Test the per-matcher recompute keeps statuses and deletes pairs that no longer match."""
+        from infonomy_server.utils import recompute_inbox_for_matcher
+        
+        other_context = DecisionContext(
+            buyer_id=sample_buyer.id,
+            query="Will it rain tomorrow?",
+            max_budget=100.0,
+            priority=1
+        )
+        test_db.add(other_context)
+        matcher = SellerMatcher(human_seller_id=sample_seller.id, keywords=["safety"])
+        test_db.add(matcher)
+        test_db.commit()
+        ctx_id = sample_decision_context.id
+        self._add_item(test_db, matcher.id, ctx_id, status="ignored")
+        self._add_item(test_db, matcher.id, other_context.id)
+        
+        recompute_inbox_for_matcher(matcher, test_db)
+        
+        assert self._items(test_db) == {(matcher.id, ctx_id): "ignored"}
+    
+    def test_age_limit_agrees_across_recomputes(self, test_db, sample_seller, sample_decision_context):
+        """Test all three recomputes drop a context older than the matcher's age limit."""
+        from infonomy_server.utils import (
+            recompute_all_inboxes, recompute_inbox_for_context, recompute_inbox_for_matcher
+        )
+        
+        sample_decision_context.created_at = datetime.utcnow() - timedelta(days=2)
+        test_db.add(sample_decision_context)
+        matcher = SellerMatcher(human_seller_id=sample_seller.id, age_limit=60 * 60 * 24)
+        test_db.add(matcher)
+        test_db.commit()
+        ctx_id = sample_decision_context.id
+        
+        self._add_item(test_db, matcher.id, ctx_id)
+        recompute_inbox_for_context(sample_decision_context, test_db, dispatch_bot_sellers=False)
+        assert self._items(test_db) == {}
+        
+        self._add_item(test_db, matcher.id, ctx_id)
+        recompute_inbox_for_matcher(matcher, test_db)
+        assert self._items(test_db) == {}
+        
+        self._add_item(test_db, matcher.id, ctx_id)
+        with patch("infonomy_server.utils._dispatch_bot_sellers"):
+            recompute_all_inboxes(test_db)
+        assert self._items(test_db) == {}
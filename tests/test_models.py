@@ -123,6 +123,46 @@ class TestHumanBuyerModel:
         assert buyer.num_purchased == {}  # Default value
         assert buyer.default_child_llm is not None
 
+    def test_human_buyer_stats_arrays(self):
+        """Test the struct-of-arrays stats view, including string keys from JSON columns."""
+        buyer = HumanBuyer(
+            id=1,
+            num_queries={"1": 4, 0: 2},
+            num_inspected={0: 1, "1": 2},
+            num_purchased={"1": 1},
+        )
+        arrays = buyer.stats_arrays()
+        assert arrays["priorities"] == [0, 1]
+        assert arrays["num_queries"] == [2, 4]
+        assert arrays["num_inspected"] == [1, 2]
+        assert arrays["num_purchased"] == [0, 1]
+        assert arrays["inspection_rate"] == [0.5, 0.5]
+        assert arrays["purchase_rate"] == [0.0, 0.25]
+
+    def test_human_buyer_rates_for(self):
+        """Test the single-priority rates agree with the rate properties."""
+        buyer = HumanBuyer(
+            id=1,
+            num_queries={0: 2, 1: 4},
+            num_inspected={0: 1, 1: 2},
+            num_purchased={1: 1},
+        )
+        assert buyer.rates_for(0) == (buyer.inspection_rate[0], buyer.purchase_rate[0])
+        assert buyer.rates_for(1) == (0.5, 0.25)
+        assert buyer.rates_for(2) == (0.0, 0.0)
+
+    def test_human_buyer_rates_for_string_keys(self):
+        """Test the single-priority rates read counters loaded from JSON, whose keys are strings."""
+        buyer = HumanBuyer(
+            id=1,
+            num_queries={"0": 2, "1": 4},
+            num_inspected={"0": 1, "1": 2},
+            num_purchased={"1": 1},
+        )
+        assert buyer.rates_for(0) == (0.5, 0.0)
+        assert buyer.rates_for(1) == (0.5, 0.25)
+        assert buyer.rates_for(2) == (0.0, 0.0)
+
 
 class TestHumanSellerModel:
     """Test the HumanSeller model."""
@@ -0,0 +1,196 @@
+"""
+Integration tests for the Celery inspection task.
+Tasks are run in-process with `.run()` against an in-memory database; the LLM and
+Celery's retry/replace are patched out.
+"""
+
+import pytest
+from unittest.mock import patch
+from sqlalchemy.pool import StaticPool
+from sqlmodel import create_engine, Session, SQLModel, select
+
+from infonomy_server import tasks
+from infonomy_server.tasks import inspect_task
+from infonomy_server.models import User, HumanBuyer, HumanSeller, DecisionContext, InfoOffer, Inspection
+
+
+@pytest.fixture
+def task_engine(monkeypatch):
+    """
+    In-memory database shared by every Session the task opens (StaticPool keeps one
+    connection), swapped in for the engine the task module uses.
+    """
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(tasks, "engine", engine)
+    return engine
+
+
+@pytest.fixture
+def inspection_setup(task_engine):
+    """A buyer with a top-level context and an Inspection of it; returns their IDs."""
+    with Session(task_engine) as session:
+        user = User(
+            username="buyer",
+            email="buyer@example.com",
+            hashed_password="$2b$12$test_hash",
+            balance=100.0,
+            available_balance=0.0,
+        )
+        session.add(user)
+        session.commit()
+        buyer = HumanBuyer(
+            id=user.id,
+            default_child_llm={
+                "name": "test-llm",
+                "description": "Test LLM buyer",
+                "model": "test-model",
+                "custom_prompt": "Test prompt",
+            },
+        )
+        session.add(buyer)
+        session.add(HumanSeller(id=user.id))
+        session.commit()
+        ctx = DecisionContext(buyer_id=buyer.id, query="Top-level question", max_budget=50.0, priority=0)
+        session.add(ctx)
+        session.commit()
+        inspection = Inspection(context_id=ctx.id, buyer_id=buyer.id)
+        session.add(inspection)
+        session.commit()
+        return {"buyer_id": buyer.id, "context_id": ctx.id, "inspection_id": inspection.id}
+
+
+@pytest.mark.integration
+class TestInspectTaskWaiting:
+    """Test the wait/retry path for child contexts that have no offers yet."""
+
+    def test_child_context_without_offers_retries(self, task_engine, inspection_setup):
+        """A fresh child context with no offers is retried later, not failed."""
+        with Session(task_engine) as session:
+            child = DecisionContext(
+                buyer_id=inspection_setup["buyer_id"],
+                parent_id=inspection_setup["context_id"],
+                query="Follow-up question",
+                max_budget=10.0,
+                priority=0,
+            )
+            session.add(child)
+            session.commit()
+            child_id = child.id
+
+        with patch.object(inspect_task, "retry", return_value=RuntimeError("retry")) as mock_retry:
+            with pytest.raises(RuntimeError, match="retry"):
+                inspect_task.run(
+                    child_id,
+                    inspection_setup["buyer_id"],
+                    inspection_id=inspection_setup["inspection_id"],
+                    depth=1,
+                )
+
+        retry_kwargs = mock_retry.call_args.kwargs
+        assert retry_kwargs["args"] == [child_id, inspection_setup["buyer_id"]]
+        assert retry_kwargs["kwargs"]["inspection_id"] == inspection_setup["inspection_id"]
+        assert retry_kwargs["kwargs"]["depth"] == 1
+
+
+def _add_offer(session, context_id, seller_id, price):
+    """Add an uninspected offer to a context and return its ID."""
+    offer = InfoOffer(
+        human_seller_id=seller_id,
+        context_id=context_id,
+        private_info=f"Private info at {price}",
+        public_info=f"Public info at {price}",
+        price=price,
+    )
+    session.add(offer)
+    session.flush()
+    return offer.id
+
+
+@pytest.mark.integration
+class TestInspectTaskBuying:
+    """Test purchases made across several passes over the same context."""
+
+    def test_purchases_across_passes_are_persisted(self, task_engine, inspection_setup):
+        """
+        Offers bought on each pass end up in the result and in Inspection.purchased; the
+        held budget is released once and each counter is bumped once for the context.
+        """
+        buyer_id = inspection_setup["buyer_id"]
+        context_id = inspection_setup["context_id"]
+        with Session(task_engine) as session:
+            first_id = _add_offer(session, context_id, buyer_id, 5.0)
+            _add_offer(session, context_id, buyer_id, 7.0)
+            session.commit()
+
+        late_ids = []
+
+        def fake_llm(context, offers, known_info, buyer, user):
+            if not late_ids:
+                # a seller answers while the first pass is running
+                late_ids.append(_add_offer(Session.object_session(context), context_id, buyer_id, 3.0))
+                return [first_id], None
+            assert [off.id for off in known_info] == [first_id]
+            return [late_ids[0]], None
+
+        with patch.object(tasks, "call_llm", side_effect=fake_llm) as mock_llm:
+            result = inspect_task.run(context_id, buyer_id, inspection_id=inspection_setup["inspection_id"])
+
+        assert mock_llm.call_count == 2
+        assert result == [first_id, late_ids[0]]
+        with Session(task_engine) as session:
+            inspection = session.get(Inspection, inspection_setup["inspection_id"])
+            assert inspection.purchased == [first_id, late_ids[0]]
+            purchased = session.exec(
+                select(InfoOffer.id).where(InfoOffer.purchased == True).order_by(InfoOffer.id)
+            ).all()
+            assert purchased == sorted([first_id, late_ids[0]])
+            user = session.get(User, buyer_id)
+            assert user.balance == 100.0 - 5.0 - 3.0
+            assert user.available_balance == 50.0
+            buyer = session.get(HumanBuyer, buyer_id)
+            assert buyer.num_inspected == {"0": 1}
+            assert buyer.num_purchased == {"0": 1}
+
+
+@pytest.mark.integration
+class TestInspectTaskChildContext:
+    """Test descending into a child context the LLM asks for."""
+
+    def test_child_context_is_chained(self, task_engine, inspection_setup):
+        """The task replaces itself with BotSeller processing, then inspection of the child."""
+        buyer_id = inspection_setup["buyer_id"]
+        context_id = inspection_setup["context_id"]
+        with Session(task_engine) as session:
+            _add_offer(session, context_id, buyer_id, 5.0)
+            session.commit()
+
+        def fake_llm(context, offers, known_info, buyer, user):
+            child = DecisionContext(
+                buyer_id=buyer_id,
+                parent_id=context_id,
+                query="Follow-up question",
+                max_budget=10.0,
+                priority=0,
+            )
+            return [], child
+
+        with patch.object(tasks, "call_llm", side_effect=fake_llm), \
+                patch.object(inspect_task, "replace", return_value="replaced") as mock_replace:
+            result = inspect_task.run(context_id, buyer_id, inspection_id=inspection_setup["inspection_id"])
+
+        assert result == "replaced"
+        with Session(task_engine) as session:
+            child_id = session.exec(
+                select(DecisionContext.id).where(DecisionContext.parent_id == context_id)
+            ).one()
+
+        bot_sellers_sig, inspect_sig = mock_replace.call_args.args[0].tasks
+        assert bot_sellers_sig.args == (child_id,)
+        assert inspect_sig.args == (child_id, buyer_id)
+        assert inspect_sig.kwargs["inspection_id"] == inspection_setup["inspection_id"]
+        assert inspect_sig.kwargs["depth"] == 1